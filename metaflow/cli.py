@@ -33,6 +33,7 @@ def start(ctx, metadata, datastore, environment, event_logger,
 def create_cli(flow_cls):
     """Build and execute CLI for a flow class."""
     from .cli_components.run_cmds import make_run_cmd, make_resume_cmd
+    from .cli_components.deploy_daemon import deploy_daemon
 
     # Add subcommands
     run_cmd = make_run_cmd(flow_cls)
@@ -40,6 +41,7 @@ def create_cli(flow_cls):
 
     start.add_command(run_cmd, "run")
     start.add_command(resume_cmd, "resume")
+    start.add_command(deploy_daemon)
 
     # Add dump command
     @start.command()
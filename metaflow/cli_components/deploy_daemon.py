@@ -0,0 +1,103 @@
+"""Long-lived CLI server used by the Deployer.
+
+``python flow.py _deploy-daemon`` imports the flow once and then serves
+CLI invocations over stdin/stdout, one JSON object per line:
+
+    request:  {"args": ["argo-workflows", "status", ...], "env": {...}}
+    response: {"rc": 0, "out": "...", "err": "..."}
+
+so repeated deployment operations skip interpreter startup and imports.
+
+Each request runs in a child forked from the daemon, so whatever it changes
+(``os.environ``, e.g. the ``METAFLOW_RUN_*`` parameter values, or module
+globals) is gone before the next request. Output the child writes straight
+to fd 1 (e.g. from subprocesses) is appended to ``out``.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import click
+
+
+def _invoke(root, prog_name, args, env):
+    """Run one CLI invocation in this process; return ``(rc, out, err)``."""
+    os.environ.update(env)
+    out = io.StringIO()
+    err = io.StringIO()
+    rc = 0
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            root.main(args=args, prog_name=prog_name, standalone_mode=False)
+        except click.exceptions.Exit as e:
+            rc = e.exit_code
+        except click.ClickException as e:
+            e.show()
+            rc = e.exit_code
+        except click.Abort:
+            rc = 1
+        except SystemExit as e:
+            rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            err.write("%s: %s\n" % (type(e).__name__, e))
+            rc = 1
+    return rc, out.getvalue(), err.getvalue()
+
+
+def _invoke_forked(root, prog_name, args, env):
+    """Run ``_invoke`` in a forked child; return ``(rc, out, err)``."""
+    rfd, wfd = os.pipe()
+    with tempfile.TemporaryFile() as fd_out:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(rfd)
+                os.dup2(fd_out.fileno(), 1)
+                result = _invoke(root, prog_name, args, env)
+                with os.fdopen(wfd, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(result))
+            finally:
+                os._exit(0)
+        os.close(wfd)
+        with os.fdopen(rfd, encoding="utf-8") as f:
+            reply = f.read()
+        os.waitpid(pid, 0)
+        fd_out.seek(0)
+        stray = fd_out.read().decode("utf-8", errors="replace")
+    if not reply:
+        return 1, stray, "Deploy daemon worker exited without a response\n"
+    rc, out, err = json.loads(reply)
+    return rc, out + stray, err
+
+
+@click.command("_deploy-daemon", hidden=True)
+@click.pass_context
+def deploy_daemon(ctx):
+    """Serve CLI invocations over stdin/stdout (used by the Deployer)."""
+    root = ctx.find_root().command
+    prog_name = ctx.find_root().info_name
+    # Keep a private handle on the protocol stream and point fd 1 at stderr,
+    # so stray writes from the daemon itself can't corrupt a response.
+    proto = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+            if not isinstance(req, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            resp = {"rc": 1, "out": "", "err": "Bad daemon request: %s\n" % e}
+        else:
+            rc, out, err = _invoke_forked(root, prog_name,
+                                          req.get("args", []),
+                                          req.get("env") or {})
+            resp = {"rc": rc, "out": out, "err": err}
+        proto.write(json.dumps(resp) + "\n")
+        proto.flush()
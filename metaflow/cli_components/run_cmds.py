@@ -251,8 +251,7 @@ def _set_cli_params(flow_cls, kwargs):
         if isinstance(obj, (Parameter, IncludeFile)):
             val = kwargs.get(obj._attr_name)
             if val is not None:
-                env_key = "METAFLOW_RUN_%s" % obj._attr_name.upper()
-                os.environ[env_key] = str(val)
+                os.environ[obj._env_key] = str(val)
 
 
 def _set_cli_configs_from_opts(config_value_pairs, config_file_pairs):
@@ -1,14 +1,75 @@
 """Step and flow decorators for Metaflow."""
 
 import hashlib
+import json
 import os
+import queue
+import threading
 import traceback
+from collections import ChainMap
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from .datastore.local import LocalDatastore
+from .graph import _parse_step_ast
+from .metaflow_current import current
 
 
 # Card registry - maps card type names to card classes
 _CARD_REGISTRY = {}
 
 
+class _RenderWorker:
+    """Daemon thread running submitted card renders one at a time.
+
+    Unlike ThreadPoolExecutor workers, which the interpreter joins at exit,
+    a daemon thread stuck in a render past its timeout doesn't keep the
+    process (e.g. spin, or API use in a script) from exiting.
+    """
+
+    def __init__(self):
+        self._jobs = queue.SimpleQueue()
+        threading.Thread(
+            target=self._run, name="mf-card-render", daemon=True
+        ).start()
+
+    def _run(self):
+        while True:
+            fut, fn, args = self._jobs.get()
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(*args))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def submit(self, fn, *args):
+        fut = Future()
+        self._jobs.put((fut, fn, args))
+        return fut
+
+
+# Shared worker for card renders that run under a timeout. Created lazily
+# and tied to the creating pid, since tasks run in forked children.
+_RENDER_POOL = None
+_RENDER_POOL_PID = None
+
+
+def _get_render_pool():
+    global _RENDER_POOL, _RENDER_POOL_PID
+    if _RENDER_POOL is None or _RENDER_POOL_PID != os.getpid():
+        _RENDER_POOL = _RenderWorker()
+        _RENDER_POOL_PID = os.getpid()
+    return _RENDER_POOL
+
+
+def _discard_render_pool():
+    """Drop the render worker so later renders don't queue behind a hung
+    one; the hung daemon thread is abandoned."""
+    global _RENDER_POOL
+    _RENDER_POOL = None
+
+
 def _register_card_type(name, cls):
     _CARD_REGISTRY[name] = cls
 
@@ -60,6 +121,12 @@ def step(f):
     f._is_step = True
     if not hasattr(f, "_decorators"):
         f._decorators = []
+    # Parse the body while the source is certainly at hand; FlowGraph reads
+    # its transitions from this tree instead of going back to the file.
+    try:
+        f._metaflow_ast = _parse_step_ast(f)
+    except (OSError, TypeError, SyntaxError):
+        f._metaflow_ast = None
     return f
 
 
@@ -69,8 +136,9 @@ class StepDecorator:
     defaults = {}
 
     def __init__(self, **kwargs):
-        self.attributes = dict(self.defaults)
-        self.attributes.update(kwargs)
+        # Layer the per-instance overrides over the class-level defaults
+        # instead of copying them; writes land in the instance's own kwargs.
+        self.attributes = ChainMap(kwargs, self.defaults)
 
     def step_init(self, flow, graph, step_name, decos, environment, datastore, logger):
         pass
@@ -184,29 +252,30 @@ class TimeoutDecorator(StepDecorator):
 
 class _CardArtifactProxy:
     """Proxy to expose flow artifacts with a .data attribute for card rendering."""
+    __slots__ = ("data",)
+
     def __init__(self, value):
         self.data = value
 
+
 class _CardTaskProxy:
-    """Task-like proxy that provides artifact access during card rendering."""
+    """Task-like proxy that provides artifact access during card rendering.
+
+    Cards render after the step body has finished, so the user-visible
+    artifacts are snapshotted once at construction.
+    """
+    __slots__ = ("_flow", "_cached_artifacts", "pathspec")
+
     def __init__(self, flow, pathspec):
         self._flow = flow
-        self._cached_artifacts = None
+        self._cached_artifacts = flow.get_artifacts()
         self.pathspec = pathspec
 
-    def _get_artifacts(self):
-        if self._cached_artifacts is None:
-            self._cached_artifacts = self._flow.get_artifacts()
-        return self._cached_artifacts
-
     def __getitem__(self, name):
-        arts = self._get_artifacts()
-        if name in arts:
-            return _CardArtifactProxy(arts[name])
-        raise KeyError(name)
+        return _CardArtifactProxy(self._cached_artifacts[name])
 
     def __contains__(self, name):
-        return name in self._get_artifacts()
+        return name in self._cached_artifacts
 
     def __str__(self):
         return self.pathspec
@@ -222,7 +291,6 @@ class CardDecorator(StepDecorator):
 
     def task_pre_step(self, step_name, task_datastore, metadata,
                       run_id, task_id, flow, graph, retry_count, max_user_code_retries):
-        from .metaflow_current import current
         card_type = self.attributes.get("type", "default")
         card_id = self.attributes.get("id")
         customize = self.attributes.get("customize", False)
@@ -234,12 +302,6 @@ class CardDecorator(StepDecorator):
         current.card._register_card(card_type, card_id, customize, allow_user)
 
     def task_post_step(self, step_name, flow, graph, retry_count, max_user_code_retries):
-        import json
-        import threading
-
-        from .metaflow_current import current
-        from .datastore.local import LocalDatastore
-
         card_type = self.attributes.get("type", "default")
         card_id = self.attributes.get("id")
         options = self.attributes.get("options") or {}
@@ -269,29 +331,15 @@ class CardDecorator(StepDecorator):
             # Render with optional timeout
             html = None
             if card_timeout and card_timeout > 0:
-                result = [None]
-                error = [None]
-
-                def _render():
-                    try:
-                        result[0] = card_inst.render(task_proxy)
-                    except Exception as e:
-                        error[0] = e
-
-                t = threading.Thread(target=_render)
-                t.daemon = True
-                t.start()
-                t.join(timeout=card_timeout)
-
-                if t.is_alive():
+                fut = _get_render_pool().submit(card_inst.render, task_proxy)
+                try:
+                    html = fut.result(timeout=card_timeout)
+                except FuturesTimeoutError:
                     # Timed out - don't save if save_errors=False
+                    _discard_render_pool()
                     if save_errors:
                         self._write_card_file(current, card_type, card_id, "")
                     return
-                elif error[0]:
-                    raise error[0]
-                else:
-                    html = result[0]
             else:
                 html = card_inst.render(task_proxy)
 
@@ -305,17 +353,14 @@ class CardDecorator(StepDecorator):
     @staticmethod
     def _write_card_file(current_obj, card_type, card_id, html):
         """Write a card as an HTML file with metadata JSON."""
-        import json
-
-        from .datastore.local import LocalDatastore
-
         ds = LocalDatastore()
         pathspec = current_obj.pathspec
         if not pathspec:
             return
 
-        parts = pathspec.split("/")
-        card_dir = os.path.join(ds.root, *parts, "cards")
+        # Not memoized: the directory may be removed between writes (e.g.
+        # by tmp cleanup), and makedirs on an existing one is cheap.
+        card_dir = os.path.join(ds.root, *pathspec.split("/"), "cards")
         os.makedirs(card_dir, exist_ok=True)
 
         idx = current_obj.card._allocate_card_index()
@@ -573,7 +618,6 @@ def test_step_decorator(f):
 
 def test_flow_decorator(cls):
     """Test flow decorator that reads METAFLOW_FOOBAR env var and sets current.foobar_value."""
-    from .metaflow_current import current
     foobar_val = os.environ.get("METAFLOW_FOOBAR")
     if foobar_val is not None:
         current._ext_attrs["foobar_value"] = foobar_val
@@ -642,93 +686,6 @@ class _ConfigExpr:
 
 # --- FlowMutator / StepMutator ---
 
-class MutableStep:
-    """Mutable view of a step for FlowMutator/StepMutator."""
-
-    def __init__(self, name, func, flow_ref=None):
-        self.name = name
-        self._func = func
-        self._flow = flow_ref
-        self.decorator_specs = list(getattr(func, "_decorators", []))
-
-    @property
-    def flow(self):
-        return self._flow
-
-    def add_decorator(self, deco_or_name, deco_kwargs=None, **kwargs):
-        if isinstance(deco_or_name, str):
-            deco_cls = _DECORATOR_REGISTRY.get(deco_or_name)
-            if deco_cls:
-                kw = deco_kwargs or kwargs
-                self.decorator_specs.append(deco_cls(**kw))
-        elif isinstance(deco_or_name, type) and issubclass(deco_or_name, StepDecorator):
-            kw = deco_kwargs or kwargs
-            self.decorator_specs.append(deco_or_name(**kw))
-        elif isinstance(deco_or_name, StepDecorator):
-            self.decorator_specs.append(deco_or_name)
-
-    def remove_decorator(self, decospec):
-        """Remove decorator by spec string (e.g., 'retry' or 'retry(times=3)')."""
-        name = decospec.split("(")[0]
-        self.decorator_specs = [d for d in self.decorator_specs if d.name != name]
-
-
-class MutableFlow:
-    """Mutable view of a flow for FlowMutator."""
-
-    def __init__(self, flow_cls):
-        self._flow_cls = flow_cls
-        self._steps = {}
-        self._configs = {}
-        self._parameters = {}
-        self._added_parameters = {}
-
-        from .parameters import Parameter
-        from .user_configs.config_parameters import Config
-
-        for attr_name in dir(flow_cls):
-            obj = getattr(flow_cls, attr_name, None)
-            if obj is not None:
-                if callable(obj) and getattr(obj, "_is_step", False):
-                    self._steps[attr_name] = MutableStep(attr_name, obj, self)
-                elif isinstance(obj, Config):
-                    self._configs[obj.name] = obj
-                elif isinstance(obj, Parameter):
-                    self._parameters[obj.name] = obj
-
-    @property
-    def steps(self):
-        return self._steps.items()
-
-    @property
-    def configs(self):
-        return self._configs.items()
-
-    @property
-    def parameters(self):
-        return list(self._parameters.items()) + list(self._added_parameters.items())
-
-    @property
-    def start(self):
-        return self._steps.get("start")
-
-    def config(self, name=None):
-        if name:
-            cfg = self._configs.get(name)
-            if cfg and cfg._is_resolved:
-                return cfg.value
-            return None
-        # Return dict-like access
-        return {n: (c.value if c._is_resolved else None) for n, c in self._configs.items()}
-
-    def add_parameter(self, name, param, overwrite=False):
-        from .parameters import Parameter
-        if isinstance(param, Parameter):
-            self._added_parameters[name] = param
-        else:
-            self._added_parameters[name] = param
-
-
 class MutableFlow:
     """Interface for FlowMutator to inspect and modify a flow class."""
 
@@ -805,13 +762,16 @@ class MutableStep:
             result.append((deco.name, dict(deco.attributes)))
         return result
 
-    def add_decorator(self, name, **kwargs):
-        """Add a decorator by name."""
-        if name in _DECORATOR_REGISTRY:
-            deco_cls = _DECORATOR_REGISTRY[name]
+    def add_decorator(self, deco_or_name, deco_kwargs=None, **kwargs):
+        """Add a decorator by name, StepDecorator class or instance."""
+        handler = _ADD_DECORATOR_DISPATCH.get(type(deco_or_name))
+        if handler is None:
+            handler = _add_decorator_fallback(deco_or_name)
+        deco = handler(deco_or_name, deco_kwargs or kwargs)
+        if deco is not None:
             if not hasattr(self._func, "_decorators"):
                 self._func._decorators = []
-            self._func._decorators.append(deco_cls(**kwargs))
+            self._func._decorators.append(deco)
 
     def remove_decorator(self, name):
         """Remove a decorator by name."""
@@ -825,6 +785,42 @@ class MutableStep:
         return self._flow
 
 
+def _add_decorator_by_name(name, kwargs):
+    deco_cls = _DECORATOR_REGISTRY.get(name)
+    return deco_cls(**kwargs) if deco_cls is not None else None
+
+
+def _add_decorator_by_class(deco_cls, kwargs):
+    if issubclass(deco_cls, StepDecorator):
+        return deco_cls(**kwargs)
+    return None
+
+
+def _add_decorator_instance(deco, kwargs):
+    return deco
+
+
+def _add_decorator_by_factory(factory, kwargs):
+    # Decorator factories such as `environment` share their registry name
+    return _add_decorator_by_name(getattr(factory, "__name__", None), kwargs)
+
+
+# Dispatch on the exact type of the add_decorator argument; anything else
+# (StepDecorator instances, factory functions) goes through the fallback.
+_ADD_DECORATOR_DISPATCH = {
+    str: _add_decorator_by_name,
+    type: _add_decorator_by_class,
+}
+
+
+def _add_decorator_fallback(deco_or_name):
+    if isinstance(deco_or_name, StepDecorator):
+        return _add_decorator_instance
+    if isinstance(deco_or_name, type):
+        return _add_decorator_by_class
+    return _add_decorator_by_factory
+
+
 class FlowMutator:
     """Base class for flow mutators applied as class decorators.
 
@@ -855,7 +851,10 @@ class FlowMutator:
 
     @staticmethod
     def apply_all_mutators(cls):
-        """Collect and apply all FlowMutators from the class hierarchy."""
+        """Collect and apply all FlowMutators from the class hierarchy.
+
+        Returns True if any mutator ran (and so may have changed the flow).
+        """
         # Collect mutators from all classes in MRO (reverse so base class mutators run first)
         mutators = []
         for klass in reversed(cls.__mro__):
@@ -865,6 +864,7 @@ class FlowMutator:
             mf = MutableFlow(cls)
             for m in mutators:
                 m.pre_mutate(mf)
+        return bool(mutators)
 
     def __call__(self, cls):
         """When used as @MyMutator("arg"), this is called with the class."""
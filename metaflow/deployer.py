@@ -3,9 +3,18 @@
 Provides programmatic deployment of Metaflow flows to various execution backends.
 """
 
+import atexit
+import json
 import os
+import selectors
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Only the tail of stderr is kept; it is used for error messages.
+_STDERR_TAIL_BYTES = 64 * 1024
+_READ_CHUNK_BYTES = 64 * 1024
 
 
 class Deployer:
@@ -18,82 +27,259 @@ class Deployer:
         deployment.trigger()
     """
 
-    def __init__(self, flow_file, **kwargs):
+    def __init__(self, flow_file, daemon=False, **kwargs):
         self.flow_file = os.path.abspath(flow_file)
         self.kwargs = kwargs
+        # With daemon=True, operations go through one long-lived flow
+        # process instead of a fresh interpreter per call.
+        self.daemon = daemon
 
     def argo_workflows(self, **kwargs):
         """Get an ArgoWorkflowsDeployment handle."""
         merged = {**self.kwargs, **kwargs}
-        return ArgoWorkflowsDeployment(self.flow_file, **merged)
+        return ArgoWorkflowsDeployment(
+            self.flow_file, daemon=self._get_daemon(), **merged
+        )
 
     def kubernetes(self, **kwargs):
         """Get a KubernetesDeployment handle."""
         merged = {**self.kwargs, **kwargs}
-        return KubernetesDeployment(self.flow_file, **merged)
+        return KubernetesDeployment(
+            self.flow_file, daemon=self._get_daemon(), **merged
+        )
+
+    def _get_daemon(self):
+        return _DeployDaemon.for_flow(self.flow_file) if self.daemon else None
+
+    @staticmethod
+    def map(op, deployments, max_workers=8):
+        """Run ``op`` (e.g. ``"create"`` or ``"status"``) on many deployments.
+
+        Each operation spawns a subprocess, so the calls are issued from a
+        thread pool and overlap their process/network latency. Results are
+        returned in input order; the first failure is re-raised.
+        """
+        deployments = list(deployments)
+        if not deployments:
+            return []
+        workers = min(max_workers, len(deployments))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda d: getattr(d, op)(), deployments))
+
+
+def _flags_for(kwargs):
+    """Serialize deployment kwargs into ``--key value`` CLI flags."""
+    return [
+        token
+        for k, v in kwargs.items() if v is not None
+        for token in ("--%s" % k.replace("_", "-"), str(v))
+    ]
+
+
+def _extra_env_for(kwargs):
+    """Stringify deployment kwargs for the subprocess environment."""
+    return {k: str(v) for k, v in kwargs.items() if v is not None}
+
+
+def _env_for(extra):
+    """Build the subprocess environment from ``_extra_env_for`` output.
+
+    Returns None (inherit the parent environment as-is) when there is
+    nothing to add, which spares copying ``os.environ`` per call.
+    """
+    return {**os.environ, **extra} if extra else None
+
+
+def _run_subprocess(cmd, env=None):
+    """Run ``cmd``, draining its pipes incrementally as raw bytes.
+
+    Returns ``(returncode, stdout, stderr_tail)``; stderr is bounded to its
+    last ``_STDERR_TAIL_BYTES`` bytes.
+    """
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    out = bytearray()
+    err = bytearray()
+    with selectors.DefaultSelector() as sel:
+        sel.register(proc.stdout, selectors.EVENT_READ, out)
+        sel.register(proc.stderr, selectors.EVENT_READ, err)
+        while sel.get_map():
+            for key, _ in sel.select():
+                chunk = os.read(key.fd, _READ_CHUNK_BYTES)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+                    continue
+                key.data.extend(chunk)
+                if key.data is err and len(err) > _STDERR_TAIL_BYTES:
+                    del err[:-_STDERR_TAIL_BYTES]
+    return proc.wait(), bytes(out), bytes(err)
+
+
+def _decode(data):
+    return data.decode("utf-8", errors="replace")
+
+
+class _DeployDaemon:
+    """Client for ``flow.py _deploy-daemon``, one process per flow file.
+
+    Requests are serialized on a lock, so handles may be shared by the
+    threads of ``Deployer.map``. A daemon that died is relaunched on the
+    next request.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_flow(cls, flow_file):
+        with cls._instances_lock:
+            daemon = cls._instances.get(flow_file)
+            if daemon is None:
+                daemon = cls._instances[flow_file] = cls(flow_file)
+            return daemon
+
+    def __init__(self, flow_file):
+        self.flow_file = flow_file
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def request(self, args, extra_env):
+        """Run one CLI invocation; return ``(returncode, stdout, stderr)``."""
+        line = json.dumps({"args": list(args), "env": extra_env}) + "\n"
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._proc = subprocess.Popen(
+                    [sys.executable, self.flow_file, "_deploy-daemon"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    encoding="utf-8",
+                )
+            try:
+                self._proc.stdin.write(line)
+                self._proc.stdin.flush()
+                reply = self._proc.stdout.readline()
+            except OSError:
+                reply = ""
+            if not reply:
+                self._stop()
+                raise RuntimeError(
+                    "Deploy daemon for %s exited unexpectedly" % self.flow_file
+                )
+        resp = json.loads(reply)
+        return resp["rc"], resp["out"], resp["err"]
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+    @classmethod
+    def close_all(cls):
+        with cls._instances_lock:
+            daemons = list(cls._instances.values())
+            cls._instances.clear()
+        for daemon in daemons:
+            daemon.close()
+
+
+atexit.register(_DeployDaemon.close_all)
+
+
+def _run_cli(flow_file, daemon, args, extra_env, env):
+    """Run ``flow_file`` with CLI ``args``; return ``(returncode, out, err)`` as text.
+
+    Goes through ``daemon`` when one is given, else spawns a subprocess
+    (with ``env``, the full environment, or None to inherit).
+    """
+    if daemon is not None:
+        return daemon.request(args, extra_env)
+    cmd = [sys.executable, flow_file, *args]
+    returncode, out, err = _run_subprocess(cmd, env=env)
+    return returncode, _decode(out), _decode(err)
 
 
 class ArgoWorkflowsDeployment:
     """Deployment handle for Argo Workflows."""
 
-    def __init__(self, flow_file, **kwargs):
+    def __init__(self, flow_file, daemon=None, **kwargs):
         self.flow_file = flow_file
         self.kwargs = kwargs
+        self._daemon = daemon
         self._workflow = None
+        # Serialized once; only per-call overrides are re-serialized.
+        self._base_flags = _flags_for(kwargs)
+        self._base_extra_env = _extra_env_for(kwargs)
+        self._base_env = _env_for(self._base_extra_env)
 
     def create(self, **kwargs):
         """Compile and register the flow as an Argo Workflow."""
-        merged = {**self.kwargs, **kwargs}
-        result = self._run_command("argo-workflows", "create", **merged)
-        return result
+        return self._run_command("argo-workflows", "create", **kwargs)
 
     def trigger(self, **kwargs):
         """Trigger execution of the deployed workflow."""
-        merged = {**self.kwargs, **kwargs}
-        result = self._run_command("argo-workflows", "trigger", **merged)
-        return result
+        return self._run_command("argo-workflows", "trigger", **kwargs)
 
     def delete(self, **kwargs):
         """Delete the deployed workflow."""
-        merged = {**self.kwargs, **kwargs}
-        return self._run_command("argo-workflows", "delete", **merged)
+        return self._run_command("argo-workflows", "delete", **kwargs)
 
     def status(self, **kwargs):
         """Get the status of the deployed workflow."""
-        merged = {**self.kwargs, **kwargs}
-        return self._run_command("argo-workflows", "status", **merged)
-
-    def _run_command(self, *args, **kwargs):
-        cmd = [sys.executable, self.flow_file] + list(args)
-        for k, v in kwargs.items():
-            if v is not None:
-                cmd.extend(["--%s" % k.replace("_", "-"), str(v)])
-        result = subprocess.run(
-            cmd, capture_output=True, text=True,
-            env={**os.environ, **{k: str(v) for k, v in kwargs.items() if v is not None}},
+        return self._run_command("argo-workflows", "status", **kwargs)
+
+    def _run_command(self, *args, **overrides):
+        if overrides:
+            merged = {**self.kwargs, **overrides}
+            flags = _flags_for(merged)
+            extra_env = _extra_env_for(merged)
+            env = _env_for(extra_env)
+        else:
+            flags = self._base_flags
+            extra_env = self._base_extra_env
+            env = self._base_env
+        cli_args = [*args, *flags]
+        returncode, out, err = _run_cli(
+            self.flow_file, self._daemon, cli_args, extra_env, env,
         )
-        if result.returncode != 0:
+        if returncode != 0:
             raise RuntimeError("Deployment command failed: %s\n%s" % (
-                " ".join(cmd), result.stderr
+                " ".join([sys.executable, self.flow_file, *cli_args]), err
             ))
-        return result.stdout
+        return out
 
 
 class KubernetesDeployment:
     """Deployment handle for direct Kubernetes execution."""
 
-    def __init__(self, flow_file, **kwargs):
+    def __init__(self, flow_file, daemon=None, **kwargs):
         self.flow_file = flow_file
         self.kwargs = kwargs
+        self._daemon = daemon
+        self._base_flags = _flags_for(kwargs)
 
     def run(self, **kwargs):
         """Run the flow on Kubernetes."""
-        merged = {**self.kwargs, **kwargs}
-        cmd = [sys.executable, self.flow_file, "run"]
-        for k, v in merged.items():
-            if v is not None:
-                cmd.extend(["--%s" % k.replace("_", "-"), str(v)])
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError("Kubernetes run failed: %s" % result.stderr)
-        return result.stdout
+        flags = _flags_for({**self.kwargs, **kwargs}) if kwargs else self._base_flags
+        returncode, out, err = _run_cli(
+            self.flow_file, self._daemon, ["run", *flags], {}, None
+        )
+        if returncode != 0:
+            raise RuntimeError("Kubernetes run failed: %s" % err)
+        return out
@@ -1,5 +1,7 @@
 """Metaflow exception classes."""
 
+import sys
+
 
 def _reconstruct_metaflow_exception(cls, args, state):
     """Reconstruct a MetaflowException subclass without calling __init__.
@@ -9,12 +11,29 @@ def _reconstruct_metaflow_exception(cls, args, state):
     """
     obj = Exception.__new__(cls)
     obj.args = args
-    obj.__dict__.update(state)
+    for name, value in state.items():
+        setattr(obj, name, value)
     return obj
 
 
+def _slot_names(cls):
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return names
+
+
 class MetaflowException(Exception):
-    headline = "Flow Exception"
+    # Slots keep the common attributes out of a per-instance __dict__;
+    # subclasses may still set arbitrary attributes (BaseException has one).
+    __slots__ = ("message", "lineno")
+    headline = sys.intern("Flow Exception")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if isinstance(cls.__dict__.get("headline"), str):
+            cls.headline = sys.intern(cls.headline)
 
     def __init__(self, msg="", lineno=None):
         self.message = msg
@@ -22,8 +41,13 @@ class MetaflowException(Exception):
         super().__init__(msg)
 
     def __reduce__(self):
+        state = {
+            name: getattr(self, name)
+            for name in _slot_names(type(self)) if hasattr(self, name)
+        }
+        state.update(self.__dict__)
         return (_reconstruct_metaflow_exception,
-                (type(self), self.args, self.__dict__.copy()))
+                (type(self), self.args, state))
 
 
 class MetaflowNotFound(MetaflowException):
@@ -35,6 +59,7 @@ class MetaflowNamespaceMismatch(MetaflowException):
 
 
 class UnhandledInMergeArtifactsException(MetaflowException):
+    __slots__ = ("artifact_names",)
     headline = "Unhandled Artifacts in Merge"
 
     def __init__(self, msg="", unhandled=None):
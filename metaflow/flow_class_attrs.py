@@ -0,0 +1,54 @@
+"""Per-class discovery of the Parameter/Config/IncludeFile/class-var attributes of a flow."""
+
+from operator import itemgetter
+
+from .parameters import FlowAttributeDescriptor, Parameter
+from .user_configs.config_parameters import Config
+from .includefile import IncludeFile
+from .util import iter_class_attrs
+
+
+_first = itemgetter(0)
+
+
+class _FlowClassAttrs:
+    """Per-class classification of Parameter/Config/IncludeFile/class vars."""
+
+    __slots__ = ("params", "configs", "includes", "class_vars", "immutable_attrs",
+                 "shadowed")
+
+    def __init__(self, flow_cls, reserved=()):
+        params = []
+        configs = []
+        includes = []
+        class_vars = []
+        shadowed = []
+        # Parameter, Config and IncludeFile share a base class, so most
+        # attributes are classified by a single isinstance check.
+        for attr_name, obj in iter_class_attrs(flow_cls):
+            if isinstance(obj, FlowAttributeDescriptor):
+                if isinstance(obj, Parameter):
+                    params.append((attr_name, obj))
+                elif isinstance(obj, Config):
+                    configs.append((attr_name, obj))
+                elif isinstance(obj, IncludeFile):
+                    includes.append((attr_name, obj))
+            elif (obj is not None and not attr_name.startswith("_") and
+                    not callable(obj) and attr_name != "name" and
+                    not isinstance(obj, (property, classmethod, staticmethod))):
+                # Class-level constants
+                class_vars.append((attr_name, obj))
+            elif (not attr_name.startswith("_") and attr_name not in reserved
+                    and not isinstance(obj, property)):
+                # None or callable (steps, helpers): an artifact of the same
+                # name has to be mirrored into the instance dict to win.
+                shadowed.append(attr_name)
+        # Keep the name order dir() used to give.
+        self.params = tuple(sorted(params, key=_first))
+        self.configs = tuple(sorted(configs, key=_first))
+        self.includes = tuple(sorted(includes, key=_first))
+        self.class_vars = tuple(sorted(class_vars, key=_first))
+        self.immutable_attrs = frozenset(
+            name for name, _ in params + configs + includes + class_vars
+        )
+        self.shadowed = frozenset(shadowed)
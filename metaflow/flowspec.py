@@ -1,21 +1,42 @@
 """FlowSpec — base class for all Metaflow flows."""
 
-from dataclasses import dataclass
-from typing import Optional
+from collections import ChainMap
+from typing import NamedTuple, Optional
 
 from .graph import FlowGraph
-from .parameters import Parameter
-from .user_configs.config_parameters import Config, ConfigValue
-from .includefile import IncludeFile
+from .flow_class_attrs import _FlowClassAttrs
+from .user_configs.config_parameters import ConfigValue
 from .decorators import FlowMutator, StepMutator
 
 
-@dataclass(frozen=True)
-class Transition:
+def _step_name_of(target):
+    """Step name for a ``self.next()`` target (bound method, function or name)."""
+    if hasattr(target, '__func__'):
+        return target.__func__.__name__
+    elif hasattr(target, '__name__'):
+        return target.__name__
+    return str(target)
+
+
+def _build_switch_map(targets):
+    """Map each dict-style switch key (as str) to its step name."""
+    return {str(k): _step_name_of(v) for k, v in targets.items()}
+
+
+class Transition(NamedTuple):
     """What self.next() produces — the step transition specification."""
-    targets: tuple                # step method refs or (dict,) for dict-style switch
-    foreach_var: str = None       # if foreach split
-    condition_var: str = None     # if switch/conditional
+    targets: tuple                          # step method refs or (dict,) for dict-style switch
+    foreach_var: Optional[str] = None       # if foreach split
+    condition_var: Optional[str] = None     # if switch/conditional
+    switch_map: Optional[dict] = None       # str key -> step name, for dict-style switch
+
+    @classmethod
+    def build(cls, targets, foreach_var=None, condition_var=None):
+        """Create a Transition, precomputing the switch map of a dict-style switch."""
+        switch_map = None
+        if condition_var and len(targets) == 1 and isinstance(targets[0], dict):
+            switch_map = _build_switch_map(targets[0])
+        return cls(targets, foreach_var, condition_var, switch_map)
 
     def resolve_switch_target(self, condition_value) -> Optional[str]:
         """Resolve which branch a switch takes.
@@ -24,30 +45,109 @@ class Transition:
         Returns the step name string.
         """
         cv = condition_value
-        if self.targets and len(self.targets) == 1 and isinstance(self.targets[0], dict):
+        switch_map = self.switch_map
+        if switch_map is None and self.targets and len(self.targets) == 1 \
+                and isinstance(self.targets[0], dict):
+            switch_map = _build_switch_map(self.targets[0])
+        if switch_map is not None:
             # Dict-style switch: condition value is a key into a mapping
-            target_func = self.targets[0].get(str(cv))
-            if target_func is not None:
-                if hasattr(target_func, '__func__'):
-                    return target_func.__func__.__name__
-                elif hasattr(target_func, '__name__'):
-                    return target_func.__name__
-                else:
-                    return str(target_func)
-            else:
-                return str(cv)
-        elif hasattr(cv, '__func__'):
-            return cv.__func__.__name__
-        elif hasattr(cv, '__name__'):
-            return cv.__name__
+            key = str(cv)
+            return switch_map.get(key, key)
+        elif hasattr(cv, '__func__') or hasattr(cv, '__name__'):
+            return _step_name_of(cv)
         elif isinstance(cv, str):
             return cv
         return None
 
 
+def _safe_eq(a, b):
+    try:
+        return bool(a == b)
+    except Exception:
+        return a is b
+
+
+def _all_equal(values):
+    """True if every value in ``values`` equals the first one.
+
+    Hashable values are deduplicated through a set; anything unhashable (or
+    with a misbehaving ``__eq__``/``__hash__``) falls back to a linear scan
+    that stops at the first mismatch.
+    """
+    try:
+        return len(set(values)) == 1
+    except Exception:
+        first = values[0]
+        return all(v is first or _safe_eq(v, first) for v in values[1:])
+
+
+# Instance attributes that _create_instance rebuilds from the class.
+_REBUILT_INSTANCE_ATTRS = frozenset((
+    "_artifacts", "_private_artifacts", "_params", "_configs", "_class_vars",
+    "_immutable_attrs", "_input", "_index", "_foreach_stack", "_next_targets",
+    "_foreach_var", "_condition_var", "_graph", "_shadowed",
+))
+
+
+def _reconstruct_flowspec(cls, artifacts, foreach_stack, input_value, index,
+                          extra=None):
+    """Unpickle a FlowSpec shipped by ``FlowSpec.__reduce__``."""
+    flow = cls._create_instance(cls._get_graph())
+    flow._artifacts.update(artifacts)
+    flow._sync_shadowed()
+    flow._foreach_stack = foreach_stack
+    flow._input = input_value
+    flow._index = index
+    if extra:
+        flow.__dict__.update(extra)
+    return flow
+
+
 class _FlowSpecMeta(type):
-    """Metaclass for FlowSpec that handles class construction."""
-    pass
+    """Metaclass for FlowSpec that handles class construction.
+
+    Caches the attribute classification and the FlowGraph of each flow class
+    so that task instances don't rescan ``dir(cls)`` or re-parse the step
+    sources. Any attribute change on a flow class (e.g. a FlowMutator adding
+    a Parameter) bumps a generation counter which invalidates every cache.
+    """
+
+    _generation = 0
+    _CACHE_ATTRS = frozenset(("_mf_class_attrs", "_mf_graph"))
+
+    def __init__(cls, name, bases, namespace):
+        super().__init__(name, bases, namespace)
+        type.__setattr__(cls, "_mf_class_attrs", None)
+        type.__setattr__(cls, "_mf_graph", None)
+
+    def __setattr__(cls, name, value):
+        type.__setattr__(cls, name, value)
+        if name not in _FlowSpecMeta._CACHE_ATTRS:
+            _FlowSpecMeta._generation += 1
+
+    def __delattr__(cls, name):
+        type.__delattr__(cls, name)
+        _FlowSpecMeta._generation += 1
+
+    def _get_class_attrs(cls):
+        cached = cls.__dict__.get("_mf_class_attrs")
+        if cached is None or cached[0] != _FlowSpecMeta._generation:
+            cached = (_FlowSpecMeta._generation,
+                      _FlowClassAttrs(cls, reserved=_FLOWSPEC_NAMES))
+            type.__setattr__(cls, "_mf_class_attrs", cached)
+        return cached[1]
+
+    def _get_graph(cls, refresh=False):
+        """Return the FlowGraph of ``cls``, building it at most once per generation.
+
+        Mutators may add decorators to step functions without touching the
+        class itself, so callers pass ``refresh=True`` after running them.
+        """
+        cached = cls.__dict__.get("_mf_graph")
+        if refresh or cached is None or cached[0] != _FlowSpecMeta._generation:
+            cached = (_FlowSpecMeta._generation, FlowGraph(cls))
+            type.__setattr__(cls, "_mf_graph", cached)
+        return cached[1]
 
 
 class FlowSpec(metaclass=_FlowSpecMeta):
@@ -56,47 +156,56 @@ class FlowSpec(metaclass=_FlowSpecMeta):
     _flow_decorators = []
 
     def __init__(self, use_cli=True):
-        self._artifacts = {}
-        self._private_artifacts = set()
-        self._params = {}
-        self._configs = {}
-        self._class_vars = {}
-        self._immutable_attrs = set()
-        self._input = None
-        self._index = None
-        self._foreach_stack = []
-        self._next_targets = None
-        self._foreach_var = None
-        self._condition_var = None
-
         # Apply deferred FlowMutators before building graph/collecting params
-        FlowMutator.apply_all_mutators(type(self))
-
-        self._graph = FlowGraph(type(self))
-
-        # Collect parameters, configs, class vars
-        for attr_name in dir(type(self)):
-            obj = getattr(type(self), attr_name, None)
-            if isinstance(obj, Parameter):
-                self._params[obj.name] = obj
-                self._immutable_attrs.add(obj._attr_name)
-            elif isinstance(obj, Config):
-                self._configs[obj.name] = obj
-                self._immutable_attrs.add(attr_name)
-            elif isinstance(obj, IncludeFile):
-                self._params[obj.name] = obj
-                self._immutable_attrs.add(obj._attr_name)
-            elif not callable(obj) and not attr_name.startswith("_") and \
-                 attr_name not in ("name",) and \
-                 not isinstance(obj, (property, classmethod, staticmethod)):
-                # Class-level constants
-                if not isinstance(obj, (Parameter, Config, IncludeFile)):
-                    self._class_vars[attr_name] = obj
+        mutated = FlowMutator.apply_all_mutators(type(self))
+
+        self._init_state(type(self)._get_graph(refresh=mutated),
+                         type(self)._get_class_attrs())
 
         if use_cli:
             from .cli import create_cli
             create_cli(type(self))
 
+    def _init_state(self, graph, class_attrs):
+        """Set up per-instance state in one ``__dict__`` write.
+
+        The param/config/class-var maps come from the class cache; writing
+        the dict directly keeps bootstrap out of ``__setattr__``.
+        """
+        params = {obj.name: obj for _, obj in class_attrs.params}
+        params.update((obj.name, obj) for _, obj in class_attrs.includes)
+        self.__dict__.update({
+            "_artifacts": {},
+            "_private_artifacts": set(),
+            "_params": params,
+            "_configs": {obj.name: obj for _, obj in class_attrs.configs},
+            "_class_vars": dict(class_attrs.class_vars),
+            "_immutable_attrs": set(class_attrs.immutable_attrs),
+            "_input": None,
+            "_index": None,
+            "_foreach_stack": [],
+            "_next_targets": None,
+            "_foreach_var": None,
+            "_condition_var": None,
+            "_graph": graph,
+            "_shadowed": class_attrs.shadowed,
+        })
+
+    def _sync_shadowed(self):
+        """Mirror artifacts named like a None/callable class attribute.
+
+        Attribute lookup only falls back to ``__getattr__`` (and so to
+        ``_artifacts``) when the class has no such name; for the few names it
+        does have, the instance ``__dict__`` copy is what shadows it.
+        """
+        d = self.__dict__
+        artifacts = d["_artifacts"]
+        for name in d["_shadowed"]:
+            if name in artifacts:
+                d[name] = artifacts[name]
+            else:
+                d.pop(name, None)
+
     @property
     def name(self):
         return type(self).__name__
@@ -109,44 +218,20 @@ class FlowSpec(metaclass=_FlowSpecMeta):
     def _create_instance(cls, graph):
         """Create a fresh runtime instance with graph but no params/configs yet."""
         flow = cls.__new__(cls)
-        flow._artifacts = {}
-        flow._private_artifacts = set()
-        flow._params = {}
-        flow._configs = {}
-        flow._class_vars = {}
-        flow._immutable_attrs = set()
-        flow._input = None
-        flow._index = None
-        flow._foreach_stack = []
-        flow._next_targets = None
-        flow._foreach_var = None
-        flow._condition_var = None
-        flow._graph = graph
-
-        for attr_name in dir(cls):
-            obj = getattr(cls, attr_name, None)
-            if isinstance(obj, Parameter):
-                flow._params[obj.name] = obj
-                flow._immutable_attrs.add(attr_name)
-            elif isinstance(obj, Config):
-                flow._configs[obj.name] = obj
-                flow._immutable_attrs.add(attr_name)
-            elif isinstance(obj, IncludeFile):
-                flow._params[obj.name] = obj
-                flow._immutable_attrs.add(attr_name)
-
-        for attr_name in dir(cls):
-            obj = getattr(cls, attr_name, None)
-            if (obj is not None and not callable(obj) and
-                    not attr_name.startswith("_") and
-                    attr_name not in ("name",) and
-                    not isinstance(obj, (property, classmethod, staticmethod,
-                                        Parameter, Config, IncludeFile))):
-                flow._class_vars[attr_name] = obj
-                flow._immutable_attrs.add(attr_name)
-
+        flow._init_state(graph, cls._get_class_attrs())
         return flow
 
+    def __reduce__(self):
+        # Ship only per-task state; the graph and the param/config/class-var
+        # maps are rebuilt from the class on the receiving side.
+        extra = {
+            k: v for k, v in self.__dict__.items()
+            if k not in _REBUILT_INSTANCE_ATTRS and k not in self._shadowed
+        }
+        args = (type(self), self._artifacts, self._foreach_stack,
+                self._input, self._index)
+        return (_reconstruct_flowspec, args + (extra,) if extra else args)
+
     def load_parent_state(self, parent_artifacts: dict):
         """Load artifacts from parent task. Filters _ prefix, extracts _foreach_stack."""
         from .runtime import _ensure_foreach_frames
@@ -155,13 +240,20 @@ class FlowSpec(metaclass=_FlowSpecMeta):
                 self._artifacts[k] = v
             elif k == "_foreach_stack":
                 self._foreach_stack = _ensure_foreach_frames(v)
+        self._sync_shadowed()
+
+    def get_persistable_state(self, task_ok: bool) -> ChainMap:
+        """Return mapping for datastore: user artifacts + _task_ok + _foreach_stack.
 
-    def get_persistable_state(self, task_ok: bool) -> dict:
-        """Return dict for datastore: user artifacts + _task_ok + _foreach_stack."""
-        arts = dict(self._artifacts)
-        arts["_task_ok"] = task_ok
-        arts["_foreach_stack"] = list(self._foreach_stack)
-        return arts
+        The result is a view layered over ``_artifacts`` rather than a copy;
+        writes to it land in the top layer and leave the flow untouched.
+        ``_foreach_stack`` is shared too: the stack is only ever rebound to a
+        fresh list (see ``_ensure_foreach_frames``), never mutated in place.
+        """
+        return ChainMap(
+            {"_task_ok": task_ok, "_foreach_stack": self._foreach_stack},
+            self._artifacts,
+        )
 
     def get_artifacts(self) -> dict:
         """Return copy of user-visible artifacts (no _ prefix)."""
@@ -170,6 +262,8 @@ class FlowSpec(metaclass=_FlowSpecMeta):
     def set_artifact(self, name, value):
         """Set a single artifact (bypasses immutability — for Runtime/decorator use)."""
         self._artifacts[name] = value
+        if name in self._shadowed:
+            self.__dict__[name] = value
 
     def set_foreach_context(self, input_value, input_index, foreach_stack):
         """Set foreach execution context."""
@@ -187,7 +281,7 @@ class FlowSpec(metaclass=_FlowSpecMeta):
         """Return Transition from last self.next() call, or None if end step."""
         if self._next_targets is None:
             return None
-        return Transition(
+        return Transition.build(
             targets=self._next_targets,
             foreach_var=self._foreach_var,
             condition_var=self._condition_var,
@@ -196,6 +290,7 @@ class FlowSpec(metaclass=_FlowSpecMeta):
     def reset_for_retry(self, base_artifacts: dict):
         """Reset artifacts to pre-execution state for retry."""
         self._artifacts = dict(base_artifacts)
+        self._sync_shadowed()
 
     def bind_params(self, resolved_params: dict):
         """Set parameter values as immutable artifacts."""
@@ -205,9 +300,8 @@ class FlowSpec(metaclass=_FlowSpecMeta):
 
     def bind_configs(self, configs: dict, flow_cls):
         """Set config values as immutable artifacts."""
-        for attr_name in dir(flow_cls):
-            obj = getattr(flow_cls, attr_name, None)
-            if isinstance(obj, Config) and obj._is_resolved:
+        for attr_name, obj in flow_cls._get_class_attrs().configs:
+            if obj._is_resolved:
                 self._artifacts[attr_name] = obj.value
 
     def bind_class_vars(self):
@@ -215,6 +309,10 @@ class FlowSpec(metaclass=_FlowSpecMeta):
         for name, val in self._class_vars.items():
             if name not in self._artifacts:
                 self._artifacts[name] = val
+            else:
+                # A value inherited from the parent task must shadow the
+                # class attribute on plain instance lookup.
+                object.__setattr__(self, name, self._artifacts[name])
 
     def set_exception(self, exc):
         """Store MetaflowExceptionWrapper on the flow."""
@@ -257,8 +355,12 @@ class FlowSpec(metaclass=_FlowSpecMeta):
                 "Cannot specify both 'exclude' and 'include' in merge_artifacts"
             )
 
-        exclude = set(exclude) if exclude else set()
-        include_set = set(include) if include else None
+        include_set = frozenset(include) if include else None
+        # Names never merged: params/configs/class vars, artifacts already
+        # set in this step, and anything explicitly excluded.
+        skip_names = self._immutable_attrs.union(self._artifacts, exclude or ())
+        # Only needed to validate `include`; gathered in the same pass.
+        all_available = set() if include_set is not None else None
 
         # Collect all artifacts from all inputs
         all_artifacts = {}
@@ -267,25 +369,21 @@ class FlowSpec(metaclass=_FlowSpecMeta):
             for name, val in inp_arts.items():
                 if name.startswith("_"):
                     continue
-                if name in self._immutable_attrs:
-                    continue
-                if name in exclude:
+                if all_available is not None:
+                    all_available.add(name)
+                if name in skip_names:
                     continue
                 if include_set is not None and name not in include_set:
                     continue
-                if name not in all_artifacts:
-                    all_artifacts[name] = []
-                all_artifacts[name].append(val)
+                values = all_artifacts.get(name)
+                if values is None:
+                    all_artifacts[name] = [val]
+                else:
+                    values.append(val)
 
         # Check for include referencing non-existent artifacts
-        if include_set:
-            all_available = set()
-            for inp in inputs:
-                inp_arts = inp.get_artifacts() if hasattr(inp, 'get_artifacts') else inp._artifacts
-                for name in inp_arts:
-                    if not name.startswith("_"):
-                        all_available.add(name)
-            missing = include_set - all_available - set(self._artifacts.keys()) - self._immutable_attrs
+        if include_set is not None:
+            missing = include_set - all_available - self._artifacts.keys() - self._immutable_attrs
             if missing:
                 raise MissingInMergeArtifactsException(
                     "The following artifacts were specified in 'include' "
@@ -296,28 +394,10 @@ class FlowSpec(metaclass=_FlowSpecMeta):
         unhandled = []
         to_set = {}
         for name, values in all_artifacts.items():
-            # Skip if already set in current step
-            if name in self._artifacts:
-                continue
-            unique_vals = []
-            for v in values:
-                is_dup = False
-                for uv in unique_vals:
-                    try:
-                        if v == uv:
-                            is_dup = True
-                            break
-                    except Exception:
-                        if v is uv:
-                            is_dup = True
-                            break
-                if not is_dup:
-                    unique_vals.append(v)
-
-            if len(unique_vals) > 1:
+            if len(values) == 1 or _all_equal(values):
+                to_set[name] = values[0]
+            else:
                 unhandled.append(name)
-            elif len(unique_vals) == 1:
-                to_set[name] = unique_vals[0]
 
         if unhandled:
             raise UnhandledInMergeArtifactsException(
@@ -330,6 +410,7 @@ class FlowSpec(metaclass=_FlowSpecMeta):
         # No conflicts — apply all merged artifacts
         for name, val in to_set.items():
             self._artifacts[name] = val
+        self._sync_shadowed()
 
     @property
     def input(self):
@@ -343,53 +424,30 @@ class FlowSpec(metaclass=_FlowSpecMeta):
         """Return foreach nesting hierarchy as (index, num_splits, value) tuples."""
         return [(frame.index, frame.num_splits, frame.value) for frame in self._foreach_stack]
 
-    def __getattribute__(self, name):
-        # For private/internal attributes, use normal lookup
-        if name.startswith("_") or name in (
-            "name", "input", "index", "next", "merge_artifacts",
-            "foreach_stack",
-            # Public interface methods
-            "load_parent_state", "get_persistable_state", "get_artifacts",
-            "set_artifact", "set_foreach_context", "set_input_context",
-            "get_transition", "reset_for_retry", "bind_params",
-            "bind_configs", "bind_class_vars", "set_exception",
-        ):
-            return object.__getattribute__(self, name)
-
-        # Check _artifacts first for user-defined artifacts, params, configs
-        try:
-            artifacts = object.__getattribute__(self, "_artifacts")
-            if name in artifacts:
-                return artifacts[name]
-        except AttributeError:
-            pass
-
-        # Fall back to normal lookup (for methods like step functions)
-        return object.__getattribute__(self, name)
-
     def __setattr__(self, name, value):
         if name.startswith("_"):
             object.__setattr__(self, name, value)
             return
 
-        # Check immutability for params and class vars
-        if hasattr(self, "_immutable_attrs") and name in self._immutable_attrs:
-            if name in self._artifacts:
-                raise AttributeError(
-                    "Cannot modify parameter/config '%s'" % name
-                )
-
-        # Check class var immutability
-        if hasattr(self, "_class_vars") and name in self._class_vars:
-            if name in self._artifacts:
-                raise AttributeError(
-                    "Cannot modify class variable '%s'" % name
-                )
-
-        if hasattr(self, "_artifacts"):
-            self._artifacts[name] = value
-        else:
+        d = self.__dict__
+        artifacts = d.get("_artifacts")
+        if artifacts is None:
             object.__setattr__(self, name, value)
+            return
+
+        # _immutable_attrs covers params, configs and class vars, and is kept
+        # live (the runtime adds resolved params to it), so one membership
+        # test guards every bound read-only attribute; _class_vars is only
+        # consulted to pick the error message.
+        if name in d.get("_immutable_attrs", ()) and name in artifacts:
+            if name in d.get("_class_vars", ()):
+                raise AttributeError("Cannot modify class variable '%s'" % name)
+            raise AttributeError(
+                "Cannot modify parameter/config '%s'" % name
+            )
+        artifacts[name] = value
+        if name in d["_shadowed"]:
+            d[name] = value
 
     def __getattr__(self, name):
         if name.startswith("_"):
@@ -409,5 +467,10 @@ class FlowSpec(metaclass=_FlowSpecMeta):
             return
         if hasattr(self, "_artifacts") and name in self._artifacts:
             del self._artifacts[name]
+            self.__dict__.pop(name, None)
         else:
             object.__delattr__(self, name)
+
+
+# FlowSpec's own API always resolves to the method, never to an artifact.
+_FLOWSPEC_NAMES = frozenset(vars(FlowSpec))
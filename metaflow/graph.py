@@ -4,10 +4,88 @@ import ast
 import inspect
 import textwrap
 
+from .util import iter_class_attrs
+
+
+def _parse_step_ast(func):
+    """Parse the source of a step function.
+
+    Not memoized here: @step keeps the result on the function as
+    ``_metaflow_ast``, which FlowGraph reads first. The tree is shared, so
+    callers must not mutate it.
+    """
+    return ast.parse(textwrap.dedent(inspect.getsource(func)))
+
+
+def _param_count(func):
+    """Number of parameters ``inspect.signature(func)`` would report.
+
+    Read straight off the code object (following ``__wrapped__`` as
+    ``signature`` does); ``signature`` is only used for non-function
+    callables.
+    """
+    target = inspect.unwrap(func)
+    code = getattr(target, "__code__", None)
+    if code is None or hasattr(target, "__signature__"):
+        try:
+            return len(inspect.signature(func).parameters)
+        except (ValueError, TypeError):
+            return 0
+    flags = code.co_flags
+    return (code.co_argcount + code.co_kwonlyargcount
+            + bool(flags & inspect.CO_VARARGS)
+            + bool(flags & inspect.CO_VARKEYWORDS))
+
+
+class _NextCallFinder(ast.NodeVisitor):
+    """Collect the ``self.next(...)`` calls in a parsed step function.
+
+    Nested functions and lambdas are not entered. Calls come back in the
+    breadth-first order ``ast.walk`` would yield them (a stable sort of the
+    depth-first visit by depth), since the last call found wins.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._found = []
+
+    def find(self, tree):
+        for stmt in tree.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self._depth = 1
+                self.generic_visit(stmt)
+        self._found.sort(key=lambda item: item[0])
+        return [call for _, call in self._found]
+
+    def generic_visit(self, node):
+        self._depth += 1
+        super().generic_visit(node)
+        self._depth -= 1
+
+    def visit_Call(self, node):
+        func = node.func
+        if (isinstance(func, ast.Attribute) and func.attr == "next"
+                and isinstance(func.value, ast.Name) and func.value.id == "self"):
+            self._found.append((self._depth, node))
+        self.generic_visit(node)
+
+    def _skip(self, node):
+        pass
+
+    visit_FunctionDef = visit_AsyncFunctionDef = visit_Lambda = _skip
+
 
 class DAGNode:
     """Represents a node in the flow DAG."""
 
+    # Graph traversal reads a handful of fields on every node; slots make
+    # those fixed-offset reads and keep nodes small.
+    __slots__ = (
+        "name", "func", "type", "in_funcs", "out_funcs", "parallel_step",
+        "num_parallel", "foreach_param", "condition", "matching_join",
+        "param_count", "_decorators",
+    )
+
     def __init__(self, name, func=None):
         self.name = name
         self.func = func
@@ -19,6 +97,7 @@ class DAGNode:
         self.foreach_param = None
         self.condition = None
         self.matching_join = None
+        self.param_count = 0
         self._decorators = []
 
     def __repr__(self):
@@ -37,13 +116,13 @@ class FlowGraph:
 
     def _build_graph(self):
         """Build the DAG by parsing step methods."""
-        # Collect all step methods
-        for attr_name in dir(self.flow_cls):
-            obj = getattr(self.flow_cls, attr_name, None)
-            if obj is not None and callable(obj) and getattr(obj, "_is_step", False):
+        # Collect all step methods, in name order as dir() used to give
+        for attr_name, obj in sorted(iter_class_attrs(self.flow_cls)):
+            if callable(obj) and getattr(obj, "_is_step", False):
                 node = DAGNode(attr_name, obj)
                 node._decorators = list(getattr(obj, "_decorators", []))
                 node.parallel_step = getattr(obj, "_parallel", False)
+                node.param_count = _param_count(obj)
                 self._nodes[attr_name] = node
                 self._steps.append(attr_name)
 
@@ -61,31 +140,40 @@ class FlowGraph:
         # Parse transitions from source code
         self._parse_transitions()
 
+        # The graph is fixed from here on; iteration reuses this order.
+        self._topo_order = self._topological_order()
+        self._assign_matching_joins()
+
     def _parse_transitions(self):
         """Parse self.next() calls from source to determine transitions."""
-        for name, node in self._nodes.items():
+        # (source, target) edges already recorded in in_funcs, so repeated
+        # self.next() targets are deduplicated without scanning the lists.
+        edges = set()
+        nodes = self._nodes
+        for name, node in nodes.items():
             if name == "end":
                 continue
             func = node.func
             try:
-                source = inspect.getsource(func)
-                source = textwrap.dedent(source)
-                tree = ast.parse(source)
+                tree = (getattr(func, "_metaflow_ast", None)
+                        or _parse_step_ast(func))
             except (OSError, TypeError, IndentationError):
                 continue
 
-            self._extract_next_calls(tree, node)
+            self._extract_next_calls(tree, node, edges)
 
-    def _extract_next_calls(self, tree, node):
-        """Extract self.next() calls from the AST."""
-        for ast_node in ast.walk(tree):
-            if not isinstance(ast_node, ast.Call):
-                continue
-            func = ast_node.func
-            if not (isinstance(func, ast.Attribute) and func.attr == "next"
-                    and isinstance(func.value, ast.Name) and func.value.id == "self"):
+        # Detect joins once every edge is known: any node with multiple
+        # in_funcs, or a (self, inputs) signature, is a join.
+        for name, n in nodes.items():
+            if n.type != "linear" or name in ("start", "end"):
                 continue
+            if len(n.in_funcs) > 1 or n.param_count >= 2:
+                n.type = "join"
 
+    def _extract_next_calls(self, tree, node, edges):
+        """Extract self.next() calls from the AST."""
+        nodes = self._nodes
+        for ast_node in _NextCallFinder().find(tree):
             targets = []
             foreach_var = None
             condition = None
@@ -116,9 +204,9 @@ class FlowGraph:
 
             # Set up incoming edges
             for t in targets:
-                if t in self._nodes:
-                    if node.name not in self._nodes[t].in_funcs:
-                        self._nodes[t].in_funcs.append(node.name)
+                if t in nodes and (node.name, t) not in edges:
+                    edges.add((node.name, t))
+                    nodes[t].in_funcs.append(node.name)
 
             # Determine node type
             if foreach_var:
@@ -128,94 +216,61 @@ class FlowGraph:
                 node.type = "foreach"  # Parallel splits are foreach-like for graph API
                 node.num_parallel = num_parallel
                 # The target step is a parallel step
-                if targets and targets[0] in self._nodes:
-                    self._nodes[targets[0]].parallel_step = True
-                    self._nodes[targets[0]].num_parallel = num_parallel
+                target = nodes.get(targets[0]) if targets else None
+                if target is not None:
+                    target.parallel_step = True
+                    target.num_parallel = num_parallel
             elif condition:
                 node.type = "split-or"
                 node.condition = condition
             elif len(targets) > 1 and not has_dict_arg:
                 node.type = "split-and"
 
-        # Detect joins: any node with multiple in_funcs
-        for name, n in self._nodes.items():
-            if len(n.in_funcs) > 1 and n.type == "linear" and name not in ("start", "end"):
-                n.type = "join"
+    def _assign_matching_joins(self):
+        """Pair each split with its join in one pass over the topological order.
 
-        # Detect joins by function signature: (self, inputs) means join
-        for name, n in self._nodes.items():
-            if n.type not in ("linear",):
-                continue
-            if name in ("start", "end"):
-                continue
-            func = n.func
-            if func is not None:
-                try:
-                    sig = inspect.signature(func)
-                    params = list(sig.parameters.keys())
-                    if len(params) >= 2:  # self + inputs
-                        n.type = "join"
-                except (ValueError, TypeError):
-                    pass
-
-        # Set matching_join for foreach and split-and nodes
-        # Must handle nesting: count depth of splits vs joins
-        for name, n in self._nodes.items():
+        Splits and joins nest like parentheses: a split opens, the next join
+        closes the innermost open split. A self-referencing split-or
+        (recursive switch) is a loop, not a split that needs a join.
+        """
+        open_splits = []
+        for n in self._topo_order:
             if n.type in ("foreach", "split-and", "split-or"):
-                current_name = n.out_funcs[0] if n.out_funcs else None
-                # Guard against self-referencing nodes (recursive switch)
-                if current_name == name:
-                    current_name = n.out_funcs[1] if len(n.out_funcs) > 1 else None
-                depth = 1
-                visited = {name}
-                while current_name and current_name not in visited:
-                    visited.add(current_name)
-                    cn = self._nodes.get(current_name)
-                    if cn is None:
-                        break
-                    if cn.type in ("foreach", "split-and", "split-or"):
-                        # Self-referencing split-or (recursive switch) is a loop,
-                        # not a true split that needs a matching join
-                        if not (cn.type == "split-or" and cn.name in cn.out_funcs):
-                            depth += 1
-                    elif cn.type == "join":
-                        depth -= 1
-                        if depth == 0:
-                            n.matching_join = current_name
-                            break
-                    current_name = cn.out_funcs[0] if cn.out_funcs else None
-                    # Skip self-references in traversal
-                    if current_name and current_name in visited:
-                        cn2 = self._nodes.get(current_name)
-                        if cn2 and len(cn2.out_funcs) > 1:
-                            for alt in cn2.out_funcs[1:]:
-                                if alt not in visited:
-                                    current_name = alt
-                                    break
+                if not (n.type == "split-or" and n.name in n.out_funcs):
+                    open_splits.append(n)
+            elif n.type == "join" and open_splits:
+                open_splits.pop().matching_join = n.name
 
-    def __iter__(self):
-        """Yield DAGNode objects in topological order."""
+    def _topological_order(self):
+        """Reverse DFS postorder from 'start', then from any unreached node.
+
+        Uses an explicit stack of (name, remaining-children) pairs rather
+        than recursion, so deep flows can't hit the recursion limit.
+        """
+        nodes = self._nodes
         visited = set()
         order = []
+        for root in ("start", *nodes):
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(nodes[root].out_funcs))]
+            while stack:
+                name, children = stack[-1]
+                for child in children:
+                    if child in nodes and child not in visited:
+                        visited.add(child)
+                        stack.append((child, iter(nodes[child].out_funcs)))
+                        break
+                else:
+                    stack.pop()
+                    order.append(nodes[name])
+        order.reverse()
+        return order
 
-        def visit(name):
-            if name in visited:
-                return
-            visited.add(name)
-            node = self._nodes[name]
-            for out in node.out_funcs:
-                if out in self._nodes:
-                    visit(out)
-            order.append(node)
-
-        visit("start")
-        # Add any remaining unvisited nodes
-        for name in self._nodes:
-            if name not in visited:
-                visit(name)
-
-        for node in reversed(order):
-            yield node
+    def __iter__(self):
+        """Yield DAGNode objects in topological order."""
+        return iter(self._topo_order)
 
     def __getitem__(self, name):
         return self._nodes[name]
@@ -2,6 +2,8 @@
 
 import os
 
+from .parameters import FlowAttributeDescriptor
+
 
 class IncludedFile:
     """Wrapper for loaded file contents."""
@@ -22,13 +24,14 @@ class IncludedFile:
         return hash(self._content)
 
 
-class IncludeFile:
+class IncludeFile(FlowAttributeDescriptor):
     """A file include descriptor for FlowSpec."""
 
     def __init__(self, name, default=None, required=True, help=None,
                  is_text=True, encoding=None):
         self.name = name
         self._attr_name = name.replace("-", "_")
+        self._env_key = "METAFLOW_RUN_%s" % self._attr_name.upper()
         self.default = default
         self.required = required
         self.help = help
@@ -37,8 +40,7 @@ class IncludeFile:
         self._value_set = False
 
     def _load_from_env(self):
-        env_key = "METAFLOW_RUN_%s" % self._attr_name.upper()
-        return os.environ.get(env_key)
+        return os.environ.get(self._env_key)
 
     def _load_file(self, path):
         if path is None:
@@ -17,8 +17,8 @@ class TaskContext:
     namespace: str = None
     username: str = "unknown"
     parameter_names: frozenset = frozenset()
-    user_tags: tuple = ()
-    sys_tags: tuple = ()
+    user_tags: frozenset = frozenset()
+    sys_tags: frozenset = frozenset()
     parallel_num_nodes: int = 1
     parallel_node_index: int = 0
     project_name: str = None
@@ -28,6 +28,10 @@ class TaskContext:
     graph: object = None
 
 
+def _as_frozenset(values):
+    return values if type(values) is frozenset else frozenset(values)
+
+
 class _ParallelInfo:
     def __init__(self):
         self.num_nodes = 1
@@ -82,31 +86,27 @@ class _CardContext:
 
     def _update_default_editable(self):
         """Determine the default editable card."""
-        # Priority 1: Card with customize=True
+        # In priority order: the first card with customize=True, else the
+        # only editable card without an id, else the only editable card.
+        no_id_count = all_count = 0
+        no_id_key = all_key = None
         for ctype, cid, customize, allow in self._registered_cards:
             if customize:
                 self._default_editable_key = (ctype, cid)
                 return
-
-        # Priority 2: Single editable card without id
-        editable_no_id = [
-            (ctype, cid) for ctype, cid, _, allow in self._registered_cards
-            if allow and cid is None
-        ]
-        if len(editable_no_id) == 1:
-            self._default_editable_key = editable_no_id[0]
-            return
-
-        # Priority 3: Single editable card (even with id)
-        editable_all = [
-            (ctype, cid) for ctype, cid, _, allow in self._registered_cards
-            if allow
-        ]
-        if len(editable_all) == 1:
-            self._default_editable_key = editable_all[0]
-            return
-
-        self._default_editable_key = None
+            if allow:
+                all_count += 1
+                all_key = (ctype, cid)
+                if cid is None:
+                    no_id_count += 1
+                    no_id_key = all_key
+
+        if no_id_count == 1:
+            self._default_editable_key = no_id_key
+        elif all_count == 1:
+            self._default_editable_key = all_key
+        else:
+            self._default_editable_key = None
 
     def _allocate_card_index(self):
         """Allocate the next card file index."""
@@ -161,61 +161,94 @@ class _CardContext:
         return {}
 
 
+# Task context kept as plain instance attributes, read-only from outside
+_READ_ONLY_ATTRS = frozenset((
+    "flow_name", "run_id", "step_name", "task_id", "retry_count",
+    "origin_run_id", "namespace", "username", "is_production", "project_name",
+    "branch_name", "project_flow_name", "parallel", "card",
+))
+
+
 class Current:
-    """Runtime context singleton for Metaflow steps."""
+    """Runtime context singleton for Metaflow steps.
+
+    Plain task context (``flow_name``, ``run_id``, ``task_id``, ...) is kept
+    in ordinary instance attributes, so reads in step code are direct
+    attribute loads; only derived or lazy values are properties. Assigning
+    to the context attributes raises, as it did when they were properties;
+    Current itself sets them through ``__dict__``.
+    """
 
     def __init__(self):
-        self._flow_name = None
-        self._run_id = None
-        self._step_name = None
-        self._task_id = None
-        self._retry_count = 0
-        self._origin_run_id = None
-        self._namespace = None
-        self._username = None
-        self._tags = frozenset()
-        self._sys_tags = frozenset()
-        self._user_tags = frozenset()
-        self._parameter_names = set()
-        self._tempdir = None
-        self._is_production = False
-        self._project_name = None
-        self._branch_name = None
-        self._project_flow_name = None
-        self._parallel = _ParallelInfo()
-        self._card = _CardContext()
-        self._graph = None
-        self._ext_attrs = {}
+        self.__dict__.update({
+            "flow_name": None,
+            "run_id": None,
+            "step_name": None,
+            "task_id": None,
+            "_pathspec": None,
+            "retry_count": 0,
+            "origin_run_id": None,
+            "namespace": None,
+            "username": None,
+            "_tags": frozenset(),
+            "_sys_tags": frozenset(),
+            "_user_tags": frozenset(),
+            "_parameter_names": set(),
+            "_tempdir": None,
+            "is_production": False,
+            "project_name": None,
+            "branch_name": None,
+            "project_flow_name": None,
+            "parallel": _ParallelInfo(),
+            "card": _CardContext(),
+            "_graph": None,
+            "_ext_attrs": {},
+        })
+
+    def __setattr__(self, name, value):
+        if name in _READ_ONLY_ATTRS:
+            raise AttributeError("Current.%s is read-only" % name)
+        object.__setattr__(self, name, value)
 
     def bind(self, ctx: TaskContext):
         """Bind all task context at once from a TaskContext dataclass."""
-        self._flow_name = ctx.flow_name
-        self._run_id = ctx.run_id
-        self._step_name = ctx.step_name
-        self._task_id = ctx.task_id
-        self._retry_count = ctx.retry_count
-        self._origin_run_id = ctx.origin_run_id
-        self._namespace = ctx.namespace
-        self._username = ctx.username
+        self.__dict__.update({
+            "flow_name": ctx.flow_name,
+            "run_id": ctx.run_id,
+            "step_name": ctx.step_name,
+            "task_id": ctx.task_id,
+            "retry_count": ctx.retry_count,
+            "origin_run_id": ctx.origin_run_id,
+            "namespace": ctx.namespace,
+            "username": ctx.username,
+            "project_name": ctx.project_name,
+            "branch_name": ctx.branch_name,
+            "project_flow_name": ctx.project_flow_name,
+            "is_production": ctx.is_production,
+        })
+        self._set_pathspec()
         self._parameter_names = set(ctx.parameter_names)
-        self._user_tags = frozenset(ctx.user_tags)
-        self._sys_tags = frozenset(ctx.sys_tags)
+        self._user_tags = _as_frozenset(ctx.user_tags)
+        self._sys_tags = _as_frozenset(ctx.sys_tags)
         self._tags = self._user_tags
-        self._parallel.num_nodes = ctx.parallel_num_nodes
-        self._parallel.node_index = ctx.parallel_node_index
-        self._project_name = ctx.project_name
-        self._branch_name = ctx.branch_name
-        self._project_flow_name = ctx.project_flow_name
-        self._is_production = ctx.is_production
+        self.parallel.num_nodes = ctx.parallel_num_nodes
+        self.parallel.node_index = ctx.parallel_node_index
         self._graph = ctx.graph
 
     def bind_retry(self, retry_count: int):
         """Update retry count within a task. Called between attempts."""
-        self._retry_count = retry_count
+        self.__dict__["retry_count"] = retry_count
+
+    def _set_pathspec(self):
+        if self.flow_name and self.run_id and self.step_name and self.task_id:
+            self._pathspec = "%s/%s/%s/%s" % (self.flow_name, self.run_id,
+                                              self.step_name, self.task_id)
+        else:
+            self._pathspec = None
 
     def _update(self, **kwargs):
-        for k, v in kwargs.items():
-            setattr(self, "_%s" % k, v)
+        self.__dict__.update(kwargs)
+        self._set_pathspec()
 
     def _update_env(self, env_dict):
         """Update extension attributes on current from a dict."""
@@ -224,49 +257,14 @@ class Current:
 
     def _set_tags(self, user_tags=None, sys_tags=None):
         if user_tags is not None:
-            self._user_tags = frozenset(user_tags)
+            self._user_tags = _as_frozenset(user_tags)
         if sys_tags is not None:
-            self._sys_tags = frozenset(sys_tags)
+            self._sys_tags = _as_frozenset(sys_tags)
         self._tags = self._user_tags
 
-    @property
-    def flow_name(self):
-        return self._flow_name
-
-    @property
-    def run_id(self):
-        return self._run_id
-
-    @property
-    def step_name(self):
-        return self._step_name
-
-    @property
-    def task_id(self):
-        return self._task_id
-
-    @property
-    def retry_count(self):
-        return self._retry_count
-
-    @property
-    def origin_run_id(self):
-        return self._origin_run_id
-
-    @property
-    def namespace(self):
-        return self._namespace
-
-    @property
-    def username(self):
-        return self._username
-
     @property
     def pathspec(self):
-        if self._flow_name and self._run_id and self._step_name and self._task_id:
-            return "%s/%s/%s/%s" % (self._flow_name, self._run_id,
-                                    self._step_name, self._task_id)
-        return None
+        return self._pathspec
 
     @property
     def tags(self):
@@ -282,49 +280,25 @@ class Current:
             self._tempdir = tempfile.mkdtemp(prefix="metaflow_")
         return self._tempdir
 
-    @property
-    def is_production(self):
-        return self._is_production
-
-    @property
-    def project_name(self):
-        return self._project_name
-
-    @property
-    def branch_name(self):
-        return self._branch_name
-
-    @property
-    def project_flow_name(self):
-        return self._project_flow_name
-
-    @property
-    def parallel(self):
-        return self._parallel
-
-    @property
-    def card(self):
-        return self._card
-
     @property
     def task(self):
         """Lazy-loaded Task from client API."""
-        if self.pathspec:
+        if self._pathspec:
             from .client import Task
-            return Task(self.pathspec)
+            return Task(self._pathspec)
         return None
 
     @property
     def run(self):
         """Lazy-loaded Run from client API."""
-        if self._flow_name and self._run_id:
+        if self.flow_name and self.run_id:
             from .client import Run
-            return Run("%s/%s" % (self._flow_name, self._run_id))
+            return Run("%s/%s" % (self.flow_name, self.run_id))
         return None
 
     @property
     def is_running_flow(self):
-        return self._flow_name is not None
+        return self.flow_name is not None
 
     def __getattr__(self, name):
         if name.startswith("_"):
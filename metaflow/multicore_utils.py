@@ -1,18 +1,35 @@
 """Multiprocessing utilities for Metaflow."""
 
+import os
+import pickle
 from multiprocessing import Pool
 
 
-def parallel_map(func, iterable):
+def _picklable(func):
+    try:
+        pickle.dumps(func)
+        return True
+    except Exception:
+        return False
+
+
+def parallel_map(func, iterable, max_parallel=None):
     """Apply func to each element of iterable using multiprocessing.
 
-    Falls back to sequential map if multiprocessing fails (e.g., with lambdas).
+    Runs sequentially, without starting any worker process, when there is
+    at most one item or when ``func`` can't be sent to a worker (e.g. a
+    lambda). Otherwise the pool is sized to the work: never more workers
+    than items (or ``max_parallel``). Falls back to sequential map if
+    multiprocessing fails.
     """
     items = list(iterable)
     if not items:
         return []
+    if len(items) == 1 or not _picklable(func):
+        return list(map(func, items))
+    processes = min(len(items), max_parallel or os.cpu_count() or 1)
     try:
-        with Pool() as pool:
+        with Pool(processes) as pool:
             return pool.map(func, items)
     except Exception:
         return list(map(func, items))
@@ -10,14 +10,96 @@ class _JSONTypeSentinel:
 
 JSONType = _JSONTypeSentinel
 
+_BOOL_FALSE = frozenset(("false", "0", "no", ""))
 
-class Parameter:
+
+class FlowAttributeDescriptor:
+    """Mixin resolving a class-level flow attribute to its bound value.
+
+    FlowSpec keeps parameter/config values in its ``_artifacts`` dict, keyed
+    by the class attribute name. Accessed through a flow instance, the
+    descriptor returns that value; before binding (or on the class) it
+    returns itself.
+    """
+
+    _flow_attr_name = None
+
+    def __set_name__(self, owner, name):
+        self._flow_attr_name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        artifacts = instance.__dict__.get("_artifacts")
+        if artifacts:
+            key = self._flow_attr_name or self._attr_name
+            if key in artifacts:
+                return artifacts[key]
+        return self
+
+
+def _effective_type(param_type, default):
+    """Declared type, or bool/int/float inferred from a basic default."""
+    if param_type is None and default is not None:
+        default_type = type(default)
+        if default_type in (bool, int, float):
+            return default_type
+    return param_type
+
+
+def _coerce_identity(val):
+    return val
+
+
+def _coerce_json(val):
+    if isinstance(val, str):
+        return json.loads(val)
+    return val
+
+
+def _coerce_bool(val):
+    if isinstance(val, str):
+        return val.lower() not in _BOOL_FALSE
+    return bool(val)
+
+
+def _make_coercer(param_type, separator):
+    """Return a function coercing a non-None value to ``param_type``.
+
+    The type dispatch happens once here, at declaration time, rather than
+    on every value: JSON wins over ``separator``, which only splits strings
+    and otherwise defers to the type's coercion.
+    """
+    if param_type is JSONType or isinstance(param_type, _JSONTypeSentinel):
+        return _coerce_json
+    if param_type is None:
+        coerce = _coerce_identity
+    # Bool must come before int since bool is a subclass of int
+    elif param_type == bool:
+        coerce = _coerce_bool
+    else:
+        def coerce(val):
+            if isinstance(val, str):
+                return param_type(val)
+            return val
+    if not separator:
+        return coerce
+
+    def _coerce_split(val):
+        if isinstance(val, str):
+            return val.split(separator)
+        return coerce(val)
+    return _coerce_split
+
+
+class Parameter(FlowAttributeDescriptor):
     """A flow parameter descriptor."""
 
     def __init__(self, name, default=None, required=False, help=None,
                  type=None, separator=None, show_default=True, **kwargs):
         self.name = name
         self._attr_name = name.replace("-", "_")
+        self._env_key = "METAFLOW_RUN_%s" % self._attr_name.upper()
         self.default = default
         self.required = required
         self.help = help
@@ -26,6 +108,7 @@ class Parameter:
         self.show_default = show_default
         self.kwargs = kwargs
         self._value_set = False
+        self._coerce = _make_coercer(_effective_type(type, default), separator)
 
     def _resolve_default(self, ctx=None):
         """Resolve the default value, handling callables and config expressions."""
@@ -39,42 +122,13 @@ class Parameter:
 
     def _load_from_env(self):
         """Try to load value from env var METAFLOW_RUN_<UPPER_NAME>."""
-        env_key = "METAFLOW_RUN_%s" % self._attr_name.upper()
-        return os.environ.get(env_key)
+        return os.environ.get(self._env_key)
 
     def _coerce_value(self, val):
         """Coerce string value to the parameter type."""
         if val is None:
             return val
-
-        # Determine effective type
-        param_type = self.type
-        if param_type is None and self.default is not None:
-            # Infer type from default for basic types
-            default_type = type(self.default)
-            if default_type in (bool, int, float):
-                param_type = default_type
-
-        if param_type is JSONType or isinstance(param_type, _JSONTypeSentinel):
-            if isinstance(val, str):
-                return json.loads(val)
-            return val
-
-        if self.separator and isinstance(val, str):
-            val = val.split(self.separator)
-            return val
-
-        if param_type is not None and param_type is not JSONType:
-            # Bool must come before int since bool is a subclass of int
-            if param_type == bool:
-                if isinstance(val, str):
-                    return val.lower() not in ("false", "0", "no", "")
-                return bool(val)
-            if isinstance(val, str):
-                return param_type(val)
-            return val
-
-        return val
+        return self._coerce(val)
 
     def click_option(self):
         """Return kwargs for @click.option."""
@@ -0,0 +1,208 @@
+"""Shared HTTP transport for the Argo Workflows and Argo Events clients.
+
+Both clients send JSON over one process-wide urllib3 connection pool, so a
+CLI session issuing many API calls reuses a handful of warm sockets instead
+of opening (and TLS-handshaking) a new connection per request. urllib3's
+PoolManager is thread-safe. When urllib3 is not installed, requests fall
+back to one-shot ``urllib.request`` calls. Bodies are encoded and decoded
+with orjson when it is installed, the stdlib ``json`` module otherwise.
+
+Setting ``METAFLOW_ARGO_HTTP2=1`` switches both clients to an httpx HTTP/2
+client instead, multiplexing concurrent calls (e.g. status polling) over a
+single connection.
+"""
+
+import json
+import os
+import urllib.request
+import urllib.error
+
+from metaflow.util import to_bytes, to_unicode
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+_pool = None
+_http2 = None
+
+
+class HTTPStatusError(Exception):
+    """Raised for an HTTP response with status >= 400."""
+
+    def __init__(self, status, reason, body):
+        super().__init__("HTTP %d: %s" % (status, reason))
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return to_bytes(json.dumps(data))
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(to_unicode(raw))
+
+
+def _get_http2_client():
+    """Return the shared httpx HTTP/2 client, or None unless it is enabled."""
+    global _http2
+    if _http2 is None:
+        if os.environ.get("METAFLOW_ARGO_HTTP2") != "1":
+            _http2 = False
+        else:
+            try:
+                import httpx
+                _http2 = httpx.Client(
+                    http2=True,
+                    timeout=60,
+                    limits=httpx.Limits(
+                        max_connections=32, max_keepalive_connections=32
+                    ),
+                )
+            except ImportError:
+                raise RuntimeError(
+                    "METAFLOW_ARGO_HTTP2=1 requires httpx with HTTP/2 support. "
+                    "Install it with: pip install 'httpx[http2]', or unset "
+                    "METAFLOW_ARGO_HTTP2."
+                )
+    return _http2 or None
+
+
+def _get_pool():
+    # Only GET and DELETE are retried on 502/503/504. urllib3's default set
+    # includes PUT, and replaying a PUT such as /resubmit could submit a
+    # workflow twice.
+    global _pool
+    if _pool is None:
+        _pool = urllib3.PoolManager(
+            num_pools=4,
+            maxsize=64,
+            retries=urllib3.Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset({"GET", "DELETE"}),
+                raise_on_status=False,
+            ),
+        )
+    return _pool
+
+
+def _headers(token, **extra):
+    if not token and not extra:
+        return _JSON_HEADERS
+    headers = dict(_JSON_HEADERS, **extra)
+    if token:
+        headers["Authorization"] = "Bearer %s" % token
+    return headers
+
+
+def request_json(method, url, data=None, token=None, timeout=60):
+    """Send ``data`` (if any) as JSON and return the decoded JSON response.
+
+    Raises HTTPStatusError for error responses; callers turn it into their
+    own API error message.
+    """
+    body = _dumps(data) if data else None
+    headers = _headers(token)
+
+    http2 = _get_http2_client()
+    if http2 is not None:
+        resp = http2.request(
+            method, url, content=body, headers=headers, timeout=timeout
+        )
+        if resp.status_code >= 400:
+            raise HTTPStatusError(resp.status_code, resp.reason_phrase, resp.text)
+        return _loads(resp.content)
+
+    if urllib3 is not None:
+        resp = _get_pool().request(
+            method,
+            url,
+            body=body,
+            headers=headers,
+            timeout=urllib3.Timeout(connect=5, read=timeout),
+        )
+        if resp.status >= 400:
+            raise HTTPStatusError(
+                resp.status, resp.reason, resp.data.decode("utf-8", "replace")
+            )
+        return _loads(resp.data)
+
+    req = urllib.request.Request(url, data=body, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return _loads(resp.read())
+    except urllib.error.HTTPError as e:
+        raise HTTPStatusError(e.code, e.reason, to_unicode(e.read()))
+
+
+def iter_json_lines(url, token=None, timeout=60):
+    """GET ``url`` and yield each newline-delimited JSON record as it arrives.
+
+    The body is requested gzip-compressed and decoded while streaming, so a
+    large response is never held in memory as a whole.
+    """
+    http2 = _get_http2_client()
+    if http2 is not None:
+        # httpx asks for and decodes gzip on its own.
+        with http2.stream("GET", url, headers=_headers(token),
+                          timeout=timeout) as resp:
+            if resp.status_code >= 400:
+                resp.read()
+                raise HTTPStatusError(
+                    resp.status_code, resp.reason_phrase, resp.text
+                )
+            for line in resp.iter_lines():
+                if line.strip():
+                    yield _loads(line)
+        return
+
+    if urllib3 is not None:
+        resp = _get_pool().request(
+            "GET",
+            url,
+            headers=_headers(token, **{"Accept-Encoding": "gzip"}),
+            timeout=urllib3.Timeout(connect=5, read=timeout),
+            preload_content=False,
+        )
+        try:
+            if resp.status >= 400:
+                raise HTTPStatusError(
+                    resp.status, resp.reason, resp.data.decode("utf-8", "replace")
+                )
+            pending = b""
+            for chunk in resp.stream(65536, decode_content=True):
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    if line.strip():
+                        yield _loads(line)
+            if pending.strip():
+                yield _loads(pending)
+        finally:
+            resp.release_conn()
+        return
+
+    req = urllib.request.Request(url, headers=_headers(token))
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            for line in resp:
+                if line.strip():
+                    yield _loads(line)
+    except urllib.error.HTTPError as e:
+        raise HTTPStatusError(e.code, e.reason, to_unicode(e.read()))
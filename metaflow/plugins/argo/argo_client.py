@@ -3,12 +3,81 @@
 Communicates with the Argo server API for workflow submission, status checks, etc.
 """
 
+import contextlib
+import hashlib
 import json
 import os
-import urllib.request
-import urllib.error
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 
-from metaflow.util import to_bytes, to_unicode
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from metaflow.util import to_bytes
+
+from ._http import HTTPStatusError, iter_json_lines, request_json
+
+# Entries of the submit_workflow_cached cache older than this (seconds),
+# or beyond the newest _SUBMIT_CACHE_MAX_ENTRIES, are pruned on write
+_SUBMIT_CACHE_MAX_AGE = 30 * 24 * 3600
+_SUBMIT_CACHE_MAX_ENTRIES = 1000
+
+
+def _api_error(e):
+    return RuntimeError("Argo API error %d: %s\n%s" % (e.status, e.reason, e.body))
+
+
+def _default_submit_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "metaflow", "argo_submissions.json")
+
+
+def _read_submit_cache(path):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_submit_cache(path, cache):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def _submit_cache_lock(path):
+    """Hold an exclusive lock on ``path`` (where flock is available)."""
+    with open(path + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def _update_submit_cache(path, key, entry):
+    """Store ``entry`` under ``key`` and prune expired and excess entries.
+
+    The read-modify-write is done under a lock, so concurrent deploys don't
+    drop each other's entries.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _submit_cache_lock(path):
+        cache = _read_submit_cache(path)
+        cache[key] = entry
+        live = [
+            (k, v) for k, v in cache.items()
+            if isinstance(v, dict)
+            and entry["ts"] - v.get("ts", 0) < _SUBMIT_CACHE_MAX_AGE
+        ]
+        live.sort(key=lambda item: item[1].get("ts", 0))
+        _write_submit_cache(path, dict(live[-_SUBMIT_CACHE_MAX_ENTRIES:]))
 
 
 class ArgoClient:
@@ -23,20 +92,10 @@ class ArgoClient:
 
     def _request(self, method, path, data=None):
         url = "%s%s" % (self.server_url, path)
-        body = to_bytes(json.dumps(data)) if data else None
-        headers = {"Content-Type": "application/json"}
-        if self.token:
-            headers["Authorization"] = "Bearer %s" % self.token
-
-        req = urllib.request.Request(url, data=body, method=method, headers=headers)
         try:
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                return json.loads(to_unicode(resp.read()))
-        except urllib.error.HTTPError as e:
-            error_body = to_unicode(e.read())
-            raise RuntimeError(
-                "Argo API error %d: %s\n%s" % (e.code, e.reason, error_body)
-            )
+            return request_json(method, url, data, token=self.token, timeout=60)
+        except HTTPStatusError as e:
+            raise _api_error(e)
 
     def submit_workflow(self, workflow_spec):
         """Submit a workflow to Argo.
@@ -58,31 +117,144 @@ class ArgoClient:
             {"workflow": workflow_spec},
         )
 
+    def submit_workflows(self, workflow_specs, max_in_flight=16):
+        """Submit several workflows concurrently.
+
+        The Argo server has no batch-create endpoint, so the submissions are
+        overlapped on a bounded thread pool instead; they share the pooled
+        keep-alive connections of ``_request``.
+
+        Parameters
+        ----------
+        workflow_specs : list of dict
+            Full Argo Workflow specs.
+        max_in_flight : int
+            Maximum number of concurrent submissions.
+
+        Returns
+        -------
+        list of dict
+            The created workflow responses, in the order of ``workflow_specs``.
+        """
+        specs = list(workflow_specs)
+        if len(specs) <= 1:
+            return [self.submit_workflow(spec) for spec in specs]
+        with ThreadPoolExecutor(max_workers=min(max_in_flight, len(specs))) as pool:
+            return list(pool.map(self.submit_workflow, specs))
+
+    def submit_workflow_cached(self, workflow_spec, max_age=None, cache_path=None):
+        """Submit a workflow unless this exact spec was already submitted.
+
+        Meant for idempotent deploys: a spec identical (as canonical JSON) to
+        one previously submitted to the same server returns the stored
+        response without an API call. Do not use it when every call must
+        create a new run.
+
+        Parameters
+        ----------
+        workflow_spec : dict
+            The full Argo Workflow spec.
+        max_age : float, optional
+            Seconds a stored response stays valid; when omitted, until it
+            is pruned from the cache (after 30 days, or once 1000 newer
+            responses are stored).
+        cache_path : str, optional
+            JSON file holding the responses; defaults to
+            ``$XDG_CACHE_HOME/metaflow/argo_submissions.json``.
+
+        Returns
+        -------
+        dict
+            The created (or previously created) workflow response.
+        """
+        path = cache_path or _default_submit_cache_path()
+        canonical = json.dumps(
+            [self.server_url, workflow_spec], sort_keys=True, separators=(",", ":")
+        )
+        key = hashlib.sha256(to_bytes(canonical)).hexdigest()
+        hit = _read_submit_cache(path).get(key)
+        # A truncated or hand-edited entry counts as a miss
+        if (
+            isinstance(hit, dict) and "response" in hit
+            and (max_age is None or time.time() - hit.get("ts", 0) < max_age)
+        ):
+            return hit["response"]
+        response = self.submit_workflow(workflow_spec)
+        _update_submit_cache(path, key, {"ts": time.time(), "response": response})
+        return response
+
     def get_workflow(self, name, namespace=None):
         """Get workflow status by name."""
         ns = namespace or self.namespace
         return self._request("GET", "/api/v1/workflows/%s/%s" % (ns, name))
 
-    def list_workflows(self, namespace=None, label_selector=None):
-        """List workflows."""
+    def iter_workflows(self, namespace=None, label_selector=None, limit=200,
+                       fields=None):
+        """Iterate over workflows, fetching them a page at a time.
+
+        Parameters
+        ----------
+        namespace : str, optional
+            Namespace to list; defaults to the client's namespace.
+        label_selector : str, optional
+            Kubernetes label selector, e.g. ``metaflow/flow_name=MyFlow``.
+        limit : int
+            Page size requested from the server.
+        fields : str, optional
+            Comma-separated workflow fields to return, e.g.
+            ``metadata.name,status.phase``; all fields when omitted.
+
+        Yields
+        ------
+        dict
+            One workflow (restricted to ``fields``) per item.
+        """
         ns = namespace or self.namespace
-        path = "/api/v1/workflows/%s" % ns
+        query = {"listOptions.limit": limit}
         if label_selector:
-            path += "?listOptions.labelSelector=%s" % label_selector
-        return self._request("GET", path)
+            query["listOptions.labelSelector"] = label_selector
+        if fields:
+            # Argo's response field filter; the continue token is needed
+            # to page through the results.
+            query["fields"] = ",".join(
+                ["metadata.continue"]
+                + ["items.%s" % f.strip() for f in fields.split(",")]
+            )
+        while True:
+            page = self._request(
+                "GET", "/api/v1/workflows/%s?%s" % (ns, urlencode(query))
+            )
+            yield from page.get("items") or ()
+            cont = (page.get("metadata") or {}).get("continue")
+            if not cont:
+                return
+            query["listOptions.continue"] = cont
+
+    def list_workflows(self, namespace=None, label_selector=None, limit=200,
+                       fields=None):
+        """Return every workflow as a list (see ``iter_workflows``)."""
+        return list(
+            self.iter_workflows(namespace, label_selector, limit, fields)
+        )
 
     def delete_workflow(self, name, namespace=None):
         """Delete a workflow."""
         ns = namespace or self.namespace
         return self._request("DELETE", "/api/v1/workflows/%s/%s" % (ns, name))
 
-    def get_workflow_logs(self, name, namespace=None, container="main"):
-        """Get logs for a workflow's pods."""
+    def iter_workflow_logs(self, name, namespace=None, container="main"):
+        """Stream logs for a workflow's pods, one log record at a time."""
         ns = namespace or self.namespace
-        return self._request(
-            "GET",
-            "/api/v1/workflows/%s/%s/log?logOptions.container=%s" % (ns, name, container),
-        )
+        url = "%s/api/v1/workflows/%s/%s/log?logOptions.container=%s" % (
+            self.server_url, ns, name, container)
+        try:
+            yield from iter_json_lines(url, token=self.token, timeout=60)
+        except HTTPStatusError as e:
+            raise _api_error(e)
+
+    def get_workflow_logs(self, name, namespace=None, container="main"):
+        """Get logs for a workflow's pods as a list of log records."""
+        return list(self.iter_workflow_logs(name, namespace, container))
 
     def resubmit_workflow(self, name, namespace=None):
         """Resubmit a workflow."""
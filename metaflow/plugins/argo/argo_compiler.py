@@ -4,12 +4,14 @@ Walks the FlowGraph and emits Argo Workflow YAML (DAG template).
 Foreach maps to withItems, branches map to parallel tasks.
 """
 
-import json
 import os
-from collections import OrderedDict
 
 from .argo_workflows_cli import sanitize_for_argo
 
+# Credentials and endpoints forwarded from the compiling environment.
+_AWS_FORWARDED_KEYS = ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY",
+                       "AWS_DEFAULT_REGION", "METAFLOW_S3_ENDPOINT_URL")
+
 
 def compile_flow_to_argo(flow_cls, flow_graph, image, namespace="default",
                          service_account=None, s3_root=None, metadata_url=None):
@@ -40,15 +42,47 @@ def compile_flow_to_argo(flow_cls, flow_graph, image, namespace="default",
     flow_name = flow_cls.__name__
     sanitized_name = sanitize_for_argo(flow_name.lower())
 
-    # Build DAG tasks from flow graph
+    # The workflow skeleton is built up front; the loop below only fills in
+    # the DAG tasks and appends the step templates after the main DAG one.
     dag_tasks = []
-    templates = []
+    templates = [{
+        "name": "main",
+        "dag": {
+            "tasks": dag_tasks,
+        },
+    }]
+    workflow = {
+        "apiVersion": "argoproj.io/v1alpha1",
+        "kind": "Workflow",
+        "metadata": {
+            "generateName": "%s-" % sanitized_name,
+            "namespace": namespace,
+            "labels": {
+                "metaflow/flow_name": flow_name,
+            },
+        },
+        "spec": {
+            "entrypoint": "main",
+            "templates": templates,
+        },
+    }
+
+    # Flow-level settings are the same for every step: resolve them (and
+    # each step's Argo name, reused for templates and dependencies) once.
+    base_env = _base_env_vars(s3_root, metadata_url)
+    task_names = {step_name: sanitize_for_argo(step_name) for step_name in flow_graph}
+
+    def _task_name(name):
+        task_name = task_names.get(name)
+        if task_name is None:
+            task_name = task_names[name] = sanitize_for_argo(name)
+        return task_name
 
     for step_name, step_info in flow_graph.items():
-        task_name = sanitize_for_argo(step_name)
+        task_name = task_names[step_name]
 
         # Build environment variables
-        env = _build_env_vars(flow_name, step_name, s3_root, metadata_url)
+        env = _build_env_vars(flow_name, step_name, base_env)
 
         # Build step command
         command = [
@@ -71,15 +105,12 @@ def compile_flow_to_argo(flow_cls, flow_graph, image, namespace="default",
         for deco in decos:
             if deco.get("name") in ("kubernetes", "resources"):
                 attrs = deco.get("attributes", {})
+                cpu = str(attrs.get("cpu", 1))
+                memory = "%sMi" % attrs.get("memory", 4096)
+                # Separate dicts, so YAML output carries no aliases.
                 template["container"]["resources"] = {
-                    "requests": {
-                        "cpu": str(attrs.get("cpu", 1)),
-                        "memory": "%sMi" % attrs.get("memory", 4096),
-                    },
-                    "limits": {
-                        "cpu": str(attrs.get("cpu", 1)),
-                        "memory": "%sMi" % attrs.get("memory", 4096),
-                    },
+                    "requests": {"cpu": cpu, "memory": memory},
+                    "limits": {"cpu": cpu, "memory": memory},
                 }
                 break
 
@@ -97,68 +128,50 @@ def compile_flow_to_argo(flow_cls, flow_graph, image, namespace="default",
         # Add dependencies (edges in the graph)
         deps = step_info.get("in_edges", [])
         if deps:
-            dag_task["dependencies"] = [sanitize_for_argo(d) for d in deps]
+            dag_task["dependencies"] = [_task_name(d) for d in deps]
 
         # Handle foreach with withItems
         if step_info.get("type") == "foreach":
             dag_task["withItems"] = "{{tasks.%s.outputs.parameters.foreach_items}}" % (
-                sanitize_for_argo(deps[0]) if deps else "start"
+                _task_name(deps[0]) if deps else "start"
             )
 
         dag_tasks.append(dag_task)
 
-    # Build the main DAG template
-    dag_template = {
-        "name": "main",
-        "dag": {
-            "tasks": dag_tasks,
-        },
-    }
-    templates.insert(0, dag_template)
-
-    # Build the full Argo Workflow
-    workflow = {
-        "apiVersion": "argoproj.io/v1alpha1",
-        "kind": "Workflow",
-        "metadata": {
-            "generateName": "%s-" % sanitized_name,
-            "namespace": namespace,
-            "labels": {
-                "metaflow/flow_name": flow_name,
-            },
-        },
-        "spec": {
-            "entrypoint": "main",
-            "templates": templates,
-        },
-    }
-
     if service_account:
         workflow["spec"]["serviceAccountName"] = service_account
 
     return workflow
 
 
-def _build_env_vars(flow_name, step_name, s3_root=None, metadata_url=None):
-    """Build Argo container environment variable list."""
-    env = [
-        {"name": "METAFLOW_FLOW_NAME", "value": flow_name},
-        {"name": "METAFLOW_STEP_NAME", "value": step_name},
-    ]
+def _base_env_vars(s3_root=None, metadata_url=None):
+    """Return the ``(name, value)`` env pairs shared by every step."""
+    env = []
 
     if s3_root:
-        env.append({"name": "METAFLOW_DATASTORE_SYSROOT_S3", "value": s3_root})
-        env.append({"name": "METAFLOW_DEFAULT_DATASTORE", "value": "s3"})
+        env.append(("METAFLOW_DATASTORE_SYSROOT_S3", s3_root))
+        env.append(("METAFLOW_DEFAULT_DATASTORE", "s3"))
 
     if metadata_url:
-        env.append({"name": "METAFLOW_SERVICE_URL", "value": metadata_url})
-        env.append({"name": "METAFLOW_DEFAULT_METADATA", "value": "service"})
+        env.append(("METAFLOW_SERVICE_URL", metadata_url))
+        env.append(("METAFLOW_DEFAULT_METADATA", "service"))
 
     # Forward AWS credentials from environment
-    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_DEFAULT_REGION",
-                "METAFLOW_S3_ENDPOINT_URL"):
-        val = os.environ.get(key)
-        if val:
-            env.append({"name": key, "value": val})
+    environ = os.environ
+    env.extend(
+        (key, environ[key]) for key in _AWS_FORWARDED_KEYS if environ.get(key)
+    )
+
+    return tuple(env)
 
-    return env
+
+def _build_env_vars(flow_name, step_name, base_env=()):
+    """Build Argo container environment variable list.
+
+    Every step gets its own dicts, so YAML output carries no aliases.
+    """
+    return [
+        {"name": "METAFLOW_FLOW_NAME", "value": flow_name},
+        {"name": "METAFLOW_STEP_NAME", "value": step_name},
+        *[{"name": name, "value": value} for name, value in base_env],
+    ]
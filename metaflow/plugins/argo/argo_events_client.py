@@ -4,12 +4,10 @@ Manages cron sensors, webhook sensors, and event triggers for
 scheduled and event-driven flow execution.
 """
 
-import json
 import os
-import urllib.request
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 
-from metaflow.util import to_bytes, to_unicode
+from ._http import HTTPStatusError, request_json
 
 
 class ArgoEventsClient:
@@ -23,16 +21,11 @@ class ArgoEventsClient:
 
     def _request(self, method, path, data=None):
         url = "%s%s" % (self.server_url, path)
-        body = to_bytes(json.dumps(data)) if data else None
-        headers = {"Content-Type": "application/json"} if body else {}
-        req = urllib.request.Request(url, data=body, method=method, headers=headers)
         try:
-            with urllib.request.urlopen(req, timeout=30) as resp:
-                return json.loads(to_unicode(resp.read()))
-        except urllib.error.HTTPError as e:
-            error_body = to_unicode(e.read())
+            return request_json(method, url, data, timeout=30)
+        except HTTPStatusError as e:
             raise RuntimeError(
-                "Argo Events API error %d: %s" % (e.code, error_body)
+                "Argo Events API error %d: %s" % (e.status, e.body)
             )
 
     def create_cron_sensor(self, flow_name, cron_schedule, workflow_template_name):
@@ -48,65 +41,16 @@ class ArgoEventsClient:
             Name of the Argo WorkflowTemplate to trigger.
         """
         sensor_name = "metaflow-%s-cron" % flow_name.lower().replace("_", "-")
-
-        event_source = {
-            "apiVersion": "argoproj.io/v1alpha1",
-            "kind": "EventSource",
-            "metadata": {
-                "name": sensor_name,
-                "namespace": self.namespace,
-            },
-            "spec": {
-                "calendar": {
-                    flow_name: {
-                        "schedule": cron_schedule,
-                    },
+        event_source = self._event_source(sensor_name, {
+            "calendar": {
+                flow_name: {
+                    "schedule": cron_schedule,
                 },
             },
-        }
-
-        sensor = {
-            "apiVersion": "argoproj.io/v1alpha1",
-            "kind": "Sensor",
-            "metadata": {
-                "name": sensor_name,
-                "namespace": self.namespace,
-            },
-            "spec": {
-                "dependencies": [
-                    {
-                        "name": "cron-dep",
-                        "eventSourceName": sensor_name,
-                        "eventName": flow_name,
-                    },
-                ],
-                "triggers": [
-                    {
-                        "template": {
-                            "name": "trigger-%s" % flow_name,
-                            "argoWorkflow": {
-                                "operation": "submit",
-                                "source": {
-                                    "resource": {
-                                        "apiVersion": "argoproj.io/v1alpha1",
-                                        "kind": "Workflow",
-                                        "metadata": {
-                                            "generateName": "%s-" % flow_name.lower(),
-                                        },
-                                        "spec": {
-                                            "workflowTemplateRef": {
-                                                "name": workflow_template_name,
-                                            },
-                                        },
-                                    },
-                                },
-                            },
-                        },
-                    },
-                ],
-            },
-        }
-
+        })
+        sensor = self._sensor(
+            sensor_name, "cron-dep", flow_name, workflow_template_name
+        )
         return {"event_source": event_source, "sensor": sensor}
 
     def create_webhook_sensor(self, flow_name, endpoint, workflow_template_name):
@@ -122,26 +66,102 @@ class ArgoEventsClient:
             Name of the Argo WorkflowTemplate to trigger.
         """
         sensor_name = "metaflow-%s-webhook" % flow_name.lower().replace("_", "-")
+        event_source = self._event_source(sensor_name, {
+            "webhook": {
+                flow_name: {
+                    "port": "12000",
+                    "endpoint": endpoint,
+                    "method": "POST",
+                },
+            },
+        })
+        sensor = self._sensor(
+            sensor_name, "webhook-dep", flow_name, workflow_template_name
+        )
+        return {"event_source": event_source, "sensor": sensor}
+
+    def install_sensor(self, kind, flow_name, schedule_or_endpoint,
+                       workflow_template_name):
+        """Build and create the event source and sensor for one flow.
 
-        event_source = {
+        Parameters
+        ----------
+        kind : str
+            'cron' or 'webhook'.
+        flow_name : str
+            Name of the flow.
+        schedule_or_endpoint : str
+            Cron expression for 'cron', webhook endpoint path for 'webhook'.
+        workflow_template_name : str
+            Name of the Argo WorkflowTemplate to trigger.
+
+        Returns
+        -------
+        dict
+            The created ``event_source`` and ``sensor`` specs.
+        """
+        if kind == "cron":
+            specs = self.create_cron_sensor(
+                flow_name, schedule_or_endpoint, workflow_template_name)
+        elif kind == "webhook":
+            specs = self.create_webhook_sensor(
+                flow_name, schedule_or_endpoint, workflow_template_name)
+        else:
+            raise ValueError(
+                "Unknown sensor kind '%s' for flow %s; use 'cron' or 'webhook'."
+                % (kind, flow_name)
+            )
+        self._request("POST", "/api/v1/event-sources/%s" % self.namespace,
+                      {"eventSource": specs["event_source"]})
+        self._request("POST", "/api/v1/sensors/%s" % self.namespace,
+                      {"sensor": specs["sensor"]})
+        return specs
+
+    def create_sensors_bulk(self, entries, max_workers=8):
+        """Install sensors for many flows concurrently.
+
+        Parameters
+        ----------
+        entries : list of tuple
+            ``(kind, flow_name, schedule_or_endpoint, workflow_template_name)``
+            tuples, as taken by ``install_sensor``.
+        max_workers : int
+            Maximum number of concurrent installs; the shared HTTP pool keeps
+            up to 64 connections per host.
+
+        Returns
+        -------
+        list
+            One item per entry, in order: the created specs, or the
+            exception raised while installing that entry.
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(entries))) as pool:
+            return list(pool.map(self._install_one, entries))
+
+    def _install_one(self, entry):
+        try:
+            return self.install_sensor(*entry)
+        except Exception as e:
+            return e
+
+    def _event_source(self, name, spec):
+        """Wrap an EventSource ``spec`` in its resource envelope."""
+        return {
             "apiVersion": "argoproj.io/v1alpha1",
             "kind": "EventSource",
             "metadata": {
-                "name": sensor_name,
+                "name": name,
                 "namespace": self.namespace,
             },
-            "spec": {
-                "webhook": {
-                    flow_name: {
-                        "port": "12000",
-                        "endpoint": endpoint,
-                        "method": "POST",
-                    },
-                },
-            },
+            "spec": spec,
         }
 
-        sensor = {
+    def _sensor(self, sensor_name, dep_name, flow_name, workflow_template_name):
+        """Build a Sensor submitting ``workflow_template_name`` on each event."""
+        return {
             "apiVersion": "argoproj.io/v1alpha1",
             "kind": "Sensor",
             "metadata": {
@@ -151,7 +171,7 @@ class ArgoEventsClient:
             "spec": {
                 "dependencies": [
                     {
-                        "name": "webhook-dep",
+                        "name": dep_name,
                         "eventSourceName": sensor_name,
                         "eventName": flow_name,
                     },
@@ -182,5 +202,3 @@ class ArgoEventsClient:
                 ],
             },
         }
-
-        return {"event_source": event_source, "sensor": sensor}
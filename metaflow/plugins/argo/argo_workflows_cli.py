@@ -1,8 +1,17 @@
 """Argo Workflows CLI utilities."""
 
+import functools
 import re
+import string
 
+_DISALLOWED_RE = re.compile(r"[^a-zA-Z0-9-]")
+# Deletes every ASCII character that is not alphanumeric or '-'.
+_ASCII_DELETE = str.maketrans("", "", "".join(
+    chr(c) for c in range(128)
+    if chr(c) not in string.ascii_letters + string.digits + "-"
+))
 
+@functools.lru_cache(maxsize=4096)
 def sanitize_for_argo(name):
     """Sanitize a name for use in Argo Workflows (RFC 1123 subdomain).
 
@@ -16,9 +25,14 @@ def sanitize_for_argo(name):
     """
     parts = name.split(".")
     sanitized_parts = []
+    ascii_only = name.isascii()
     for part in parts:
-        # Remove characters that are not alphanumeric or hyphen
-        part = re.sub(r"[^a-zA-Z0-9-]", "", part)
+        # Remove characters that are not alphanumeric or hyphen; translate
+        # covers the usual ASCII names, the regex anything else.
+        if ascii_only:
+            part = part.translate(_ASCII_DELETE)
+        else:
+            part = _DISALLOWED_RE.sub("", part)
         # Strip leading hyphens
         part = part.lstrip("-")
         if part:
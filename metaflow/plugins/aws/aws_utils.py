@@ -22,11 +22,13 @@ def validate_aws_tag(key, value):
         raise AWSException(
             "AWS tag value exceeds 256 characters for key '%s'" % key
         )
-    if key.lower().startswith("aws:"):
+    # Lowercase only the 4-character prefix, not the whole (up to 256 char)
+    # string.
+    if key[:4].lower() == "aws:":
         raise AWSException(
             "AWS tag key must not start with 'aws:': '%s'" % key
         )
-    if value.lower().startswith("aws:"):
+    if value[:4].lower() == "aws:":
         raise AWSException(
             "AWS tag value must not start with 'aws:' for key '%s'" % key
         )
@@ -51,16 +53,17 @@ def compute_resource_attributes(decos, current, defaults):
     """
     result = {}
 
-    # Find any @resources decorator in the list
-    resources_deco = None
-    for d in decos:
-        if d.name == "resources":
-            resources_deco = d
-            break
+    # Attributes of the first @resources decorator in the list, if any
+    resources_attrs = next(
+        (d.attributes for d in decos if d.name == "resources"), None
+    )
+    current_attrs = current.attributes
 
     for attr_name, default_val in defaults.items():
-        current_val = current.attributes.get(attr_name)
-        resources_val = resources_deco.attributes.get(attr_name) if resources_deco else None
+        current_val = current_attrs.get(attr_name)
+        resources_val = (
+            resources_attrs.get(attr_name) if resources_attrs is not None else None
+        )
 
         # Determine if value is numeric (can be compared numerically)
         is_numeric = default_val is not None and _is_numeric(default_val)
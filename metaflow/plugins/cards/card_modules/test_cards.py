@@ -13,51 +13,48 @@ class TestStringComponent:
         return self.text
 
 
-class TaskspecCard(MetaflowCard):
-    type = "taskspec_card"
-    ALLOW_USER_COMPONENTS = False
-
-    def render(self, task):
-        return str(task) if task else ""
-
-
-class TestPathspecCard(MetaflowCard):
-    type = "test_pathspec_card"
-    ALLOW_USER_COMPONENTS = False
-
-    def render(self, task):
-        return str(task) if task else ""
-
-
-class TestEditableCard(MetaflowCard):
-    type = "test_editable_card"
-    ALLOW_USER_COMPONENTS = True
-
-    def render(self, task):
-        components = getattr(self, '_components', [])
-        if components:
-            # Only render components that have a render() method
-            parts = []
-            for comp in components:
-                if hasattr(comp, 'render'):
-                    parts.append(comp.render())
-            return "\n".join(parts)
-        return str(task) if task else ""
-
-
-class TestEditableCard2(MetaflowCard):
-    type = "test_editable_card_2"
-    ALLOW_USER_COMPONENTS = True
-
-    def render(self, task):
-        components = getattr(self, '_components', [])
-        if components:
-            parts = []
-            for comp in components:
-                if hasattr(comp, 'render'):
-                    parts.append(comp.render())
-            return "\n".join(parts)
-        return str(task) if task else ""
+def _render_components(components):
+    """Join the output of every component that has a render() method."""
+    return "\n".join([c.render() for c in components
+                      if getattr(type(c), "render", None) is not None])
+
+
+def _render_components_or_task(card, task):
+    # Even non-editable cards can have components if accessed via id
+    components = getattr(card, "_components", None)
+    if components:
+        return _render_components(components)
+    return str(task) if task else ""
+
+
+def _render_task(card, task):
+    return str(task) if task else ""
+
+
+def _make_card(name, card_type, allow_user_components=False,
+               render_components=False):
+    """Create a card class that renders its components, or else the task."""
+    return type(name, (MetaflowCard,), {
+        "__module__": __name__,
+        "type": card_type,
+        "ALLOW_USER_COMPONENTS": allow_user_components,
+        "render": (_render_components_or_task if render_components
+                   else _render_task),
+    })
+
+
+TaskspecCard = _make_card("TaskspecCard", "taskspec_card")
+TestPathspecCard = _make_card("TestPathspecCard", "test_pathspec_card")
+TestEditableCard = _make_card(
+    "TestEditableCard", "test_editable_card", True, True)
+TestEditableCard2 = _make_card(
+    "TestEditableCard2", "test_editable_card_2", True, True)
+EditableImportTestCard = _make_card(
+    "EditableImportTestCard", "editable_import_test_card", True, True)
+NonEditableImportTestCard = _make_card(
+    "NonEditableImportTestCard", "non_editable_import_test_card")
+TestNonEditableCard = _make_card(
+    "TestNonEditableCard", "test_non_editable_card", False, True)
 
 
 class TestTimeoutCard(MetaflowCard):
@@ -80,45 +77,6 @@ class TestBrokenCard(MetaflowCard):
         raise ImportError("This card is intentionally broken")
 
 
-class EditableImportTestCard(MetaflowCard):
-    type = "editable_import_test_card"
-    ALLOW_USER_COMPONENTS = True
-
-    def render(self, task):
-        components = getattr(self, '_components', [])
-        if components:
-            parts = []
-            for comp in components:
-                if hasattr(comp, 'render'):
-                    parts.append(comp.render())
-            return "\n".join(parts)
-        return str(task) if task else ""
-
-
-class NonEditableImportTestCard(MetaflowCard):
-    type = "non_editable_import_test_card"
-    ALLOW_USER_COMPONENTS = False
-
-    def render(self, task):
-        return str(task) if task else ""
-
-
-class TestNonEditableCard(MetaflowCard):
-    type = "test_non_editable_card"
-    ALLOW_USER_COMPONENTS = False
-
-    def render(self, task):
-        components = getattr(self, '_components', [])
-        if components:
-            # Even non-editable cards can have components if accessed via id
-            parts = []
-            for comp in components:
-                if hasattr(comp, 'render'):
-                    parts.append(comp.render())
-            return "\n".join(parts)
-        return str(task) if task else ""
-
-
 # Register all card types
 for cls in [TaskspecCard, TestPathspecCard, TestEditableCard, TestEditableCard2,
             TestTimeoutCard, TestBrokenCard, EditableImportTestCard,
@@ -1,31 +1,60 @@
 """Metaflow S3 client.
 
 Provides a high-level interface for interacting with S3-compatible storage.
-Thread-safe — each S3 instance creates its own boto3 client.
+Thread-safe — boto3 clients are pooled per region, endpoint and credential
+source and shared by all S3 instances (see s3util.get_client_pool), so
+connections stay warm from one context to the next. Each thread, including
+the workers behind multi-object calls, uses its own client from the pool.
+Retries, multipart transfers and listings are in s3io.
 """
 
-import json
 import os
 import random
 import shutil
 import tempfile
+import threading
 from collections import namedtuple
 from hashlib import sha1
-from urllib.parse import urlparse
+from urllib.parse import urlsplit
 
 from metaflow.exception import MetaflowException
 from metaflow.util import to_bytes, to_unicode, url_quote
 
-from .s3op import generate_local_path
-
-# Retry configuration for transient S3 errors
-S3_TRANSIENT_RETRY_COUNT = 7
-S3_TRANSIENT_RETRY_CODES = frozenset(
-    ["SlowDown", "RequestTimeout", "ServiceUnavailable", "InternalError"]
+from .s3op import (
+    _build_range_header,
+    _dumps_metadata,
+    _loads_metadata,
+    _parse_content_range_total,
+    generate_local_path,
+)
+from .s3io import (
+    S3_TRANSIENT_RETRY_CODES,
+    S3_TRANSIENT_RETRY_COUNT,
+    _error_code,
+    _relative_key_fn,
+    _S3Transfer,
 )
+from .s3util import get_client_pool
+
+# Default number of objects transferred concurrently by the *_many calls.
+# Transfers are I/O bound, so this can be raised well past the CPU count;
+# connection pools grow with it (see S3._create_client).
+S3_MAX_WORKERS = int(os.environ.get("METAFLOW_S3_WORKER_COUNT", 16))
+
+# Shards for list_recursive/get_recursive(shard_prefixes=...) when keys
+# under each listed prefix start with a hex digit (e.g. hashes)
+S3_HEX_SHARDS = "0123456789abcdef"
+
+# Most HEAD responses kept by S3(cache_info=True)
+S3_HEAD_CACHE_SIZE = 1024
+
+# Lower bound on the boto3 connection pool size
+S3_MAX_POOL_CONNECTIONS = 64
 
 S3RangeInfo = namedtuple("S3RangeInfo", "total_size request_offset request_length")
 
+_S3_PREFIX = "s3://"
+
 # Metadata key for user-defined attributes
 METADATA_USER_KEY = "metaflow-user-attributes"
 
@@ -57,125 +86,61 @@ class S3GetObject:
     As output: holds downloaded data and metadata.
     """
 
+    __slots__ = (
+        "url", "_req_offset", "_req_size",
+        "key", "prefix", "path", "size", "exists", "downloaded", "has_info",
+        "content_type", "range_info", "metadata", "encryption", "_data",
+    )
+
     def __init__(self, url=None, req_offset=None, req_size=None):
         # Request fields
-        self._url = url
+        self.url = url
         self._req_offset = req_offset
         self._req_size = req_size
 
         # Result fields
-        self._key = None
-        self._prefix = None
-        self._path = None
-        self._size = None
-        self._exists = None
-        self._downloaded = False
-        self._has_info = False
-        self._content_type = None
-        self._range_info = None
-        self._metadata = None
-        self._encryption = None
-
-    @property
-    def url(self):
-        return self._url
-
-    @url.setter
-    def url(self, val):
-        self._url = val
-
-    @property
-    def key(self):
-        return self._key
-
-    @key.setter
-    def key(self, val):
-        self._key = val
-
-    @property
-    def prefix(self):
-        return self._prefix
-
-    @prefix.setter
-    def prefix(self, val):
-        self._prefix = val
-
-    @property
-    def path(self):
-        return self._path
-
-    @path.setter
-    def path(self, val):
-        self._path = val
-
-    @property
-    def size(self):
-        return self._size
-
-    @size.setter
-    def size(self, val):
-        self._size = val
-
-    @property
-    def exists(self):
-        return self._exists
-
-    @exists.setter
-    def exists(self, val):
-        self._exists = val
-
-    @property
-    def downloaded(self):
-        return self._downloaded
-
-    @downloaded.setter
-    def downloaded(self, val):
-        self._downloaded = val
-
-    @property
-    def has_info(self):
-        return self._has_info
-
-    @has_info.setter
-    def has_info(self, val):
-        self._has_info = val
-
-    @property
-    def content_type(self):
-        return self._content_type
-
-    @content_type.setter
-    def content_type(self, val):
-        self._content_type = val
-
-    @property
-    def range_info(self):
-        return self._range_info
-
-    @range_info.setter
-    def range_info(self, val):
-        self._range_info = val
-
-    @property
-    def metadata(self):
-        return self._metadata
-
-    @metadata.setter
-    def metadata(self, val):
-        self._metadata = val
-
-    @property
-    def encryption(self):
-        return self._encryption
-
-    @encryption.setter
-    def encryption(self, val):
-        self._encryption = val
+        self.key = None
+        self.prefix = None
+        self.path = None
+        self.size = None
+        self.exists = None
+        self.downloaded = False
+        self.has_info = False
+        self.content_type = None
+        self.range_info = None
+        self.metadata = None
+        self.encryption = None
+        # Body of an in_memory download, which has no path
+        self._data = None
+
+    @classmethod
+    def _listed(cls, url, key, prefix, exists, size=None):
+        """Build a listing entry, setting every slot once (listings can
+        return millions of entries). Keep in step with __init__."""
+        obj = cls.__new__(cls)
+        obj.url = url
+        obj._req_offset = None
+        obj._req_size = None
+        obj.key = key
+        obj.prefix = prefix
+        obj.path = None
+        obj.size = size
+        obj.exists = exists
+        obj.downloaded = False
+        obj.has_info = False
+        obj.content_type = None
+        obj.range_info = None
+        obj.metadata = None
+        obj.encryption = None
+        obj._data = None
+        return obj
 
     @property
     def blob(self):
-        if self._path and os.path.exists(self._path):
-            with open(self._path, "rb") as f:
+        if self._data is not None:
+            return self._data
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "rb") as f:
                 return f.read()
         return None
 
@@ -202,7 +167,7 @@ class S3PutObject:
         yield self.value if self.value is not None else self.path
 
 
-class S3:
+class S3(_S3Transfer):
     """High-level S3 client with context manager support.
 
     Usage:
@@ -212,18 +177,27 @@ class S3:
     """
 
     def __init__(self, s3root=None, bucket=None, prefix=None, run=None,
-                 inject_failure_rate=0, encryption=None, **kwargs):
+                 inject_failure_rate=0, encryption=None, max_workers=None,
+                 cache_info=False, **kwargs):
         self._s3root = None
         self._bucket = bucket
         self._prefix = prefix or ""
         self._inject_failure_rate = inject_failure_rate
         self._encryption = encryption
+        self._max_workers = max_workers or S3_MAX_WORKERS
         self._tmpdir = None
         self._client = None
+        # With cache_info, HEAD responses of existing objects are reused by
+        # info()/info_many() until this instance uploads to the same key.
+        # Off by default: changes made by other writers aren't seen.
+        self._head_cache = {} if cache_info else None
+        self._head_cache_lock = threading.Lock()
+        # Cleared if the provider rejects If-None-Match on PUT
+        self._conditional_put = True
 
         if s3root is not None:
             self._s3root = s3root.rstrip("/") if s3root else s3root
-            parsed = urlparse(s3root, allow_fragments=False)
+            parsed = urlsplit(s3root, allow_fragments=False)
             self._bucket = parsed.netloc
             self._prefix = parsed.path.lstrip("/")
             # Remove trailing slash from prefix
@@ -266,10 +240,17 @@ class S3:
                     "DATASTORE_SYSROOT_S3 not configured."
                 )
             self._s3root = "%s/%s/%s" % (ds_root.rstrip("/"), flow_name, run_id)
-            parsed = urlparse(self._s3root, allow_fragments=False)
+            parsed = urlsplit(self._s3root, allow_fragments=False)
             self._bucket = parsed.netloc
             self._prefix = parsed.path.lstrip("/").rstrip("/")
 
+        # Joined onto every relative key, so computed once
+        self._prefix_slash = self._prefix + "/" if self._prefix else ""
+        # Per-object key derivations, with the root checks decided here once
+        self._relative_key = _relative_key_fn(self._s3root)
+        self._key_in_root = _relative_key_fn(self._prefix)
+        self._root_or_none = self._s3root or None
+
     def __enter__(self):
         self._tmpdir = tempfile.mkdtemp(prefix="metaflow.s3.")
         self._client = self._create_client()
@@ -280,39 +261,54 @@ class S3:
             shutil.rmtree(self._tmpdir, ignore_errors=True)
         self._tmpdir = None
         self._client = None
+        if self._head_cache is not None:
+            self._head_cache.clear()
 
     def _create_client(self):
-        import boto3
         endpoint_url = os.environ.get("METAFLOW_S3_ENDPOINT_URL")
         region = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
-        kwargs = {"region_name": region}
-        if endpoint_url:
-            kwargs["endpoint_url"] = endpoint_url
-        return boto3.client("s3", **kwargs)
+        # Per-client connection cap: upload_fileobj's transfer threads all
+        # share the calling thread's client, so it needs room for them
+        # ("Connection pool is full").
+        pool_size = max(2 * self._max_workers, S3_MAX_POOL_CONNECTIONS)
+        return get_client_pool(region, endpoint_url, pool_size)
 
     def _should_inject_failure(self):
         if self._inject_failure_rate > 0:
             return random.randint(1, 100) <= self._inject_failure_rate
         return False
 
+    def _injected_failures_exhausted(self):
+        """Roll for injected failures, retrying each one immediately.
+
+        Returns True if the first try and all S3_TRANSIENT_RETRY_COUNT
+        retries failed. Injected failures aren't backed off from: no server
+        is involved.
+        """
+        for _ in range(S3_TRANSIENT_RETRY_COUNT + 1):
+            if not self._should_inject_failure():
+                return False
+        return True
+
     def _parse_url(self, url_or_key):
         """Parse a URL or key into (bucket, key, full_url)."""
-        if isinstance(url_or_key, S3GetObject):
+        if type(url_or_key) is str:
+            url_str = url_or_key
+        elif isinstance(url_or_key, S3GetObject):
             url_str = url_or_key.url
-            if url_str is None:
-                url_str = url_or_key._url
         else:
             url_str = str(url_or_key)
 
-        if url_str.startswith("s3://"):
-            parsed = urlparse(url_str, allow_fragments=False)
-            bucket = parsed.netloc
-            key = parsed.path.lstrip("/")
+        if url_str.startswith(_S3_PREFIX):
+            # Split by hand: urlsplit is slow, and would drop anything after
+            # a '?' in the key
+            slash = url_str.find("/", 5)
+            key = url_str[slash + 1:].lstrip("/") if slash >= 0 else ""
             if not key:
                 raise MetaflowS3URLException(
                     "S3 URL must include a path: '%s'" % url_str
                 )
-            return bucket, key, url_str
+            return url_str[5:slash], key, url_str
 
         if self._s3root is None:
             raise MetaflowS3URLException(
@@ -320,49 +316,51 @@ class S3:
             )
 
         # It's a relative key
-        if self._prefix:
-            full_key = "%s/%s" % (self._prefix, url_str.lstrip("/"))
-        else:
-            full_key = url_str.lstrip("/")
-        full_url = "s3://%s/%s" % (self._bucket, full_key)
-        return self._bucket, full_key, full_url
+        full_key = self._prefix_slash + url_str.lstrip("/")
+        return self._bucket, full_key, "s3://%s/%s" % (self._bucket, full_key)
+
+    def _info_head(self, bucket, key):
+        """HEAD for info(), served from the cache_info cache if enabled.
+
+        Missing objects are never cached, so they are seen once created.
+        """
+        cache = self._head_cache
+        if cache is None:
+            return self._head_object(bucket, key)
+        head = cache.get((bucket, key))
+        if head is None:
+            head = self._head_object(bucket, key)
+            if head is not None:
+                with self._head_cache_lock:
+                    if len(cache) >= S3_HEAD_CACHE_SIZE:
+                        # Drop the oldest entry
+                        cache.pop(next(iter(cache)))
+                    cache[(bucket, key)] = head
+        return head
 
     def _head_object(self, bucket, key):
         """HEAD an object, returning metadata dict or None if not found."""
         try:
-            resp = self._client.head_object(Bucket=bucket, Key=key)
+            resp = self._retry(self._client.head_object, Bucket=bucket, Key=key)
             return resp
         except self._client.exceptions.NoSuchKey:
             return None
         except Exception as e:
-            error_code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            error_code = _error_code(e)
             if error_code == "404" or error_code == "NoSuchKey":
                 return None
             if error_code == "403" or error_code == "AccessDenied":
                 raise MetaflowS3AccessDenied("Access denied for s3://%s/%s" % (bucket, key))
             raise
 
-    def _download_object(self, bucket, key, local_path, req_offset=None, req_size=None):
-        """Download an S3 object to a local file, optionally with range."""
-        kwargs = {"Bucket": bucket, "Key": key}
-        if req_offset is not None or req_size is not None:
-            range_str = _build_range_header(req_offset, req_size)
-            if range_str:
-                kwargs["Range"] = range_str
-
-        resp = self._client.get_object(**kwargs)
-        with open(local_path, "wb") as f:
-            for chunk in resp["Body"].iter_chunks():
-                f.write(chunk)
-        return resp
-
     def _fill_result(self, result, bucket, key, full_url, download=True,
-                     return_info=True, req_offset=None, req_size=None):
+                     return_info=True, req_offset=None, req_size=None,
+                     in_memory=False):
         """Fill an S3GetObject with data from S3."""
         result.url = full_url
         if result.key is None:
             if self._s3root and full_url.startswith(self._s3root):
-                result.key = full_url[len(self._s3root):].lstrip("/")
+                result.key = self._relative_key(full_url)
                 result.prefix = self._s3root
             else:
                 result.key = full_url
@@ -370,7 +368,7 @@ class S3:
 
         if not download:
             # Info only
-            head = self._head_object(bucket, key)
+            head = self._info_head(bucket, key)
             if head is None:
                 result.exists = False
                 result.downloaded = False
@@ -387,7 +385,7 @@ class S3:
                 raw_meta = head.get("Metadata", {})
                 user_attrs = raw_meta.get(METADATA_USER_KEY)
                 if user_attrs:
-                    result.metadata = json.loads(user_attrs)
+                    result.metadata = _loads_metadata(user_attrs)
                 else:
                     result.metadata = None
                 enc = head.get("ServerSideEncryption")
@@ -395,19 +393,18 @@ class S3:
                     result.encryption = enc
             return result
 
-        # Download
-        local_fname = generate_local_path(
-            full_url,
-            range="bytes=%s-%s" % (req_offset or 0, req_size or "")
-            if (req_offset is not None or req_size is not None)
-            else "whole",
-        )
-        local_path = os.path.join(self._tmpdir, local_fname)
+        # Download. The Range header also tells ranges of a URL apart on disk.
+        ranged = req_offset is not None or req_size is not None
+        range_header = _build_range_header(req_offset, req_size) if ranged else None
+        local_path = None
+        if not in_memory:
+            local_fname = generate_local_path(full_url, range=range_header or "whole")
+            local_path = os.path.join(self._tmpdir, local_fname)
 
         try:
-            resp = self._download_object(bucket, key, local_path, req_offset, req_size)
+            resp, data = self._download_object(bucket, key, local_path, range_header)
         except Exception as e:
-            error_code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+            error_code = _error_code(e)
             if error_code in ("404", "NoSuchKey"):
                 result.exists = False
                 result.downloaded = False
@@ -417,14 +414,18 @@ class S3:
                 raise MetaflowS3AccessDenied("Access denied: s3://%s/%s" % (bucket, key))
             raise MetaflowS3NotFound("Failed to get s3://%s/%s: %s" % (bucket, key, str(e)))
 
-        file_size = os.path.getsize(local_path)
+        if data is None:
+            file_size = os.path.getsize(local_path)
+        else:
+            file_size = len(data)
         result.exists = True
         result.downloaded = True
         result.path = local_path
+        result._data = data
         result.size = file_size
 
         # Build range info
-        if req_offset is not None or req_size is not None:
+        if ranged:
             content_range = resp.get("ContentRange", "")
             total_size = _parse_content_range_total(content_range, file_size)
             real_offset = req_offset if req_offset is not None else 0
@@ -452,7 +453,7 @@ class S3:
             raw_meta = resp.get("Metadata", {})
             user_attrs = raw_meta.get(METADATA_USER_KEY)
             if user_attrs:
-                result.metadata = json.loads(user_attrs)
+                result.metadata = _loads_metadata(user_attrs)
             else:
                 result.metadata = None
             enc = resp.get("ServerSideEncryption")
@@ -473,10 +474,8 @@ class S3:
 
         bucket, key, full_url = self._parse_url(url)
         result = S3GetObject(full_url)
-        result.key = full_url[len(self._s3root):].lstrip("/") if (
-            self._s3root and full_url.startswith(self._s3root)
-        ) else full_url
-        result.prefix = self._s3root if self._s3root else None
+        result.key = self._relative_key(full_url)
+        result.prefix = self._root_or_none
 
         self._fill_result(result, bucket, key, full_url, download=False, return_info=True)
         if not result.exists and not return_missing:
@@ -485,22 +484,33 @@ class S3:
 
     def info_many(self, urls, return_missing=False):
         """Get metadata for multiple S3 objects without downloading."""
-        results = []
+        jobs = []
         for url in urls:
             bucket, key, full_url = self._parse_url(url)
             result = S3GetObject(full_url)
-            result.key = full_url[len(self._s3root):].lstrip("/") if (
-                self._s3root and full_url.startswith(self._s3root)
-            ) else full_url
-            result.prefix = self._s3root if self._s3root else None
-            self._fill_result(result, bucket, key, full_url, download=False, return_info=True)
-            if not result.exists and not return_missing:
-                raise MetaflowS3NotFound("Object not found: %s" % full_url)
-            results.append(result)
+            result.key = self._relative_key(full_url)
+            result.prefix = self._root_or_none
+            jobs.append((result, bucket, key, full_url))
+
+        def _head(job):
+            result, bucket, key, full_url = job
+            return self._fill_result(
+                result, bucket, key, full_url, download=False, return_info=True
+            )
+
+        results = self._run_parallel(_head, jobs)
+        missing = [result.url for result in results if not result.exists]
+        if missing and not return_missing:
+            raise MetaflowS3NotFound("Objects not found: %s" % ", ".join(missing[:5]))
         return results
 
-    def get(self, url_or_key=None, return_missing=False, return_info=False):
-        """Download a single S3 object."""
+    def get(self, url_or_key=None, return_missing=False, return_info=False,
+            in_memory=False):
+        """Download a single S3 object.
+
+        With ``in_memory`` the body is kept in memory for ``.blob`` and
+        never written to disk; ``.path`` is None.
+        """
         if url_or_key is None:
             if self._s3root:
                 url_or_key = self._s3root
@@ -518,24 +528,22 @@ class S3:
 
         bucket, key, full_url = self._parse_url(url_or_key)
         result = S3GetObject(full_url)
-        result.key = full_url[len(self._s3root):].lstrip("/") if (
-            self._s3root and full_url.startswith(self._s3root)
-        ) else full_url
-        result.prefix = self._s3root if self._s3root else None
+        result.key = self._relative_key(full_url)
+        result.prefix = self._root_or_none
 
         self._fill_result(
             result, bucket, key, full_url,
             download=True, return_info=return_info,
-            req_offset=req_offset, req_size=req_size,
+            req_offset=req_offset, req_size=req_size, in_memory=in_memory,
         )
         if not result.exists and not return_missing:
             raise MetaflowS3NotFound("Object not found: %s" % full_url)
         return result
 
-    def get_many(self, urls_or_keys, return_missing=False, return_info=False):
-        """Download multiple S3 objects."""
-        results = []
-        missing = []
+    def get_many(self, urls_or_keys, return_missing=False, return_info=False,
+                 in_memory=False):
+        """Download multiple S3 objects (see get() for ``in_memory``)."""
+        jobs = []
         for url_or_key in urls_or_keys:
             req_offset = None
             req_size = None
@@ -545,37 +553,31 @@ class S3:
 
             bucket, key, full_url = self._parse_url(url_or_key)
             result = S3GetObject(full_url)
-            result.key = full_url[len(self._s3root):].lstrip("/") if (
-                self._s3root and full_url.startswith(self._s3root)
-            ) else full_url
-            result.prefix = self._s3root if self._s3root else None
-
-            retries = S3_TRANSIENT_RETRY_COUNT
-            while True:
-                if self._should_inject_failure():
-                    if retries > 0:
-                        retries -= 1
-                        continue
-                    raise MetaflowS3Exception("Injected failure after retries exhausted")
-                break
+            result.key = self._relative_key(full_url)
+            result.prefix = self._root_or_none
+
+            if self._injected_failures_exhausted():
+                raise MetaflowS3Exception("Injected failure after retries exhausted")
 
+            jobs.append((result, bucket, key, full_url, req_offset, req_size))
+
+        def _fetch(job):
+            result, bucket, key, full_url, req_offset, req_size = job
             try:
                 self._fill_result(
                     result, bucket, key, full_url,
                     download=True, return_info=return_info,
                     req_offset=req_offset, req_size=req_size,
+                    in_memory=in_memory,
                 )
-            except MetaflowS3AccessDenied:
-                raise
             except MetaflowS3NotFound:
                 result.exists = False
                 result.downloaded = False
                 result.size = None
+            return result
 
-            if not result.exists:
-                missing.append(full_url)
-            results.append(result)
-
+        results = self._run_parallel(_fetch, jobs)
+        missing = [result.url for result in results if not result.exists]
         if missing and not return_missing:
             raise MetaflowS3NotFound("Objects not found: %s" % ", ".join(missing[:5]))
         return results
@@ -586,76 +588,72 @@ class S3:
             raise MetaflowS3URLException("Cannot get_all without s3root")
 
         keys = self._list_objects(self._bucket, self._prefix)
-        results = []
+        jobs = []
         for key in sorted(keys):
             full_url = "s3://%s/%s" % (self._bucket, key)
             result = S3GetObject(full_url)
-            result.key = key[len(self._prefix):].lstrip("/") if self._prefix else key
+            result.key = self._key_in_root(key)
             result.prefix = self._s3root
+            jobs.append((result, key, full_url))
 
-            retries = S3_TRANSIENT_RETRY_COUNT
-            while True:
-                if self._should_inject_failure():
-                    if retries > 0:
-                        retries -= 1
-                        continue
-                    break
-                break
-
-            self._fill_result(
+        def _fetch(job):
+            result, key, full_url = job
+            return self._fill_result(
                 result, self._bucket, key, full_url,
                 download=True, return_info=return_info,
             )
-            results.append(result)
-        return results
 
-    def get_recursive(self, prefixes=None):
-        """Download all objects recursively under given prefixes."""
+        return self._run_parallel(_fetch, jobs)
+
+    def get_recursive(self, prefixes=None, shard_prefixes=None):
+        """Download all objects recursively under given prefixes.
+
+        See list_recursive() for ``shard_prefixes``.
+        """
         if self._s3root is None:
             raise MetaflowS3URLException("Cannot get_recursive without s3root")
 
         if prefixes is None:
             prefixes = [""]
 
-        results = []
-        for prefix in prefixes:
-            if prefix:
-                full_prefix = "%s/%s" % (self._prefix, prefix) if self._prefix else prefix
-            else:
-                full_prefix = self._prefix
-
-            # Ensure prefix ends with '/' for proper listing
-            list_prefix = full_prefix
-            if list_prefix and not list_prefix.endswith("/"):
-                list_prefix += "/"
-
-            keys = self._list_objects(self._bucket, list_prefix)
-            prefix_results = []
-            for key in sorted(keys):
-                full_url = "s3://%s/%s" % (self._bucket, key)
-                result = S3GetObject(full_url)
-                result.key = key[len(self._prefix):].lstrip("/") if self._prefix else key
+        def _jobs():
+            for prefix in prefixes:
                 if prefix:
-                    result.prefix = "%s/%s" % (self._s3root, prefix) if self._s3root else prefix
+                    full_prefix = self._prefix_slash + prefix
                 else:
-                    result.prefix = self._s3root
+                    full_prefix = self._prefix
 
-                retries = S3_TRANSIENT_RETRY_COUNT
-                while True:
-                    if self._should_inject_failure():
-                        if retries > 0:
-                            retries -= 1
-                            continue
-                        break
-                    break
+                # Ensure prefix ends with '/' for proper listing
+                list_prefix = full_prefix
+                if list_prefix and not list_prefix.endswith("/"):
+                    list_prefix += "/"
 
-                self._fill_result(
-                    result, self._bucket, key, full_url,
-                    download=True, return_info=False,
-                )
-                prefix_results.append(result)
-            results.extend(prefix_results)
-        return results
+                if shard_prefixes:
+                    keys = sorted(self._list_objects(
+                        self._bucket, list_prefix, shard_prefixes
+                    ))
+                else:
+                    # Downloads start while later pages are listed; S3
+                    # lists keys in sorted (UTF-8 binary) order.
+                    keys = self._iter_objects(self._bucket, list_prefix)
+                for key in keys:
+                    full_url = "s3://%s/%s" % (self._bucket, key)
+                    result = S3GetObject(full_url)
+                    result.key = self._key_in_root(key)
+                    if prefix:
+                        result.prefix = "%s/%s" % (self._s3root, prefix) if self._s3root else prefix
+                    else:
+                        result.prefix = self._s3root
+                    yield result, key, full_url
+
+        def _fetch(job):
+            result, key, full_url = job
+            return self._fill_result(
+                result, self._bucket, key, full_url,
+                download=True, return_info=False,
+            )
+
+        return self._run_parallel(_fetch, _jobs())
 
     def put(self, key, value=None, overwrite=True, content_type=None,
             metadata=None, encryption=None):
@@ -671,22 +669,17 @@ class S3:
                 "Value must be str or bytes, got %s" % type(value).__name__
             )
 
-        full_key = "%s/%s" % (self._prefix, key) if self._prefix else key
+        full_key = self._prefix_slash + key
         full_url = "s3://%s/%s" % (self._bucket, full_key)
 
-        if not overwrite:
-            head = self._head_object(self._bucket, full_key)
-            if head is not None:
-                return full_url
-
-        body = to_bytes(value) if isinstance(value, (str, bytes)) else value
-        if body is None:
-            # value is a local file path
-            if isinstance(key, str) and os.path.exists(key):
-                with open(key, "rb") as f:
-                    body = f.read()
-            else:
-                raise MetaflowS3InvalidObject("No value or valid file path provided")
+        body = path = None
+        if value is not None:
+            body = to_bytes(value)
+        elif isinstance(key, str) and os.path.exists(key):
+            # key names a local file, streamed from disk by _upload
+            path = key
+        else:
+            raise MetaflowS3InvalidObject("No value or valid file path provided")
 
         extra = {}
         enc = encryption or self._encryption
@@ -695,11 +688,9 @@ class S3:
         if content_type:
             extra["ContentType"] = content_type
         if metadata:
-            extra["Metadata"] = {METADATA_USER_KEY: json.dumps(metadata)}
+            extra["Metadata"] = {METADATA_USER_KEY: _dumps_metadata(metadata)}
 
-        self._client.put_object(
-            Bucket=self._bucket, Key=full_key, Body=body, **extra
-        )
+        self._upload(full_key, extra, body=body, path=path, overwrite=overwrite)
         return full_url
 
     def put_many(self, key_value_pairs, overwrite=True):
@@ -710,6 +701,11 @@ class S3:
         if self._s3root is None:
             raise MetaflowS3URLException("Cannot put_many without s3root")
 
+        existing = set()
+        if not overwrite:
+            key_value_pairs = list(key_value_pairs)
+            existing = self._existing_keys(key_value_pairs)
+
         results = []
         failed = []
         for item in key_value_pairs:
@@ -734,13 +730,9 @@ class S3:
                     "Value must be str or bytes, got %s" % type(value).__name__
                 )
 
-            full_key = "%s/%s" % (self._prefix, key) if self._prefix else key
-
-            if not overwrite:
-                head = self._head_object(self._bucket, full_key)
-                if head is not None:
-                    continue
-
+            full_key = self._prefix_slash + key
+            if full_key in existing:
+                continue
             body = to_bytes(value)
             extra = {}
             effective_enc = enc or self._encryption
@@ -749,26 +741,15 @@ class S3:
             if content_type:
                 extra["ContentType"] = content_type
             if meta:
-                extra["Metadata"] = {METADATA_USER_KEY: json.dumps(meta)}
-
-            retries = S3_TRANSIENT_RETRY_COUNT
-            uploaded = False
-            while retries >= 0:
-                if self._should_inject_failure():
-                    retries -= 1
-                    if retries < 0:
-                        failed.append(key)
-                        break
-                    continue
-                self._client.put_object(
-                    Bucket=self._bucket, Key=full_key, Body=body, **extra
-                )
-                uploaded = True
-                break
+                extra["Metadata"] = {METADATA_USER_KEY: _dumps_metadata(meta)}
 
-            if uploaded:
-                full_url = "s3://%s/%s" % (self._bucket, full_key)
-                results.append((key, full_url))
+            if self._injected_failures_exhausted():
+                failed.append(key)
+                continue
+            if not self._upload(full_key, extra, body=body, overwrite=overwrite):
+                continue
+            full_url = "s3://%s/%s" % (self._bucket, full_key)
+            results.append((key, full_url))
 
         if failed:
             raise MetaflowS3Exception(
@@ -789,7 +770,13 @@ class S3:
         if self._s3root is None:
             raise MetaflowS3URLException("Cannot put_files without s3root")
 
+        existing = set()
+        if not overwrite:
+            put_objects = list(put_objects)
+            existing = self._existing_keys(put_objects)
+
         results = []
+        failed = []
         for obj in put_objects:
             if isinstance(obj, S3PutObject):
                 key = obj.key
@@ -810,12 +797,9 @@ class S3:
             if not os.path.exists(path):
                 raise MetaflowS3NotFound("Local file not found: %s" % path)
 
-            full_key = "%s/%s" % (self._prefix, key) if self._prefix else key
-
-            if not overwrite:
-                head = self._head_object(self._bucket, full_key)
-                if head is not None:
-                    continue
+            full_key = self._prefix_slash + key
+            if full_key in existing:
+                continue
 
             extra = {}
             effective_enc = enc or self._encryption
@@ -824,23 +808,21 @@ class S3:
             if content_type:
                 extra["ContentType"] = content_type
             if meta:
-                extra["Metadata"] = {METADATA_USER_KEY: json.dumps(meta)}
-
-            retries = S3_TRANSIENT_RETRY_COUNT
-            while True:
-                if self._should_inject_failure():
-                    if retries > 0:
-                        retries -= 1
-                        continue
-                    break
-                with open(path, "rb") as f:
-                    self._client.put_object(
-                        Bucket=self._bucket, Key=full_key, Body=f, **extra
-                    )
-                break
+                extra["Metadata"] = {METADATA_USER_KEY: _dumps_metadata(meta)}
+
+            if self._injected_failures_exhausted():
+                failed.append(key)
+                continue
+            if not self._upload(full_key, extra, path=path, overwrite=overwrite):
+                continue
 
             full_url = "s3://%s/%s" % (self._bucket, full_key)
             results.append((key, full_url))
+
+        if failed:
+            raise MetaflowS3Exception(
+                "%d upload(s) failed after retries exhausted" % len(failed)
+            )
         return results
 
     def list_paths(self, prefixes=None):
@@ -854,106 +836,72 @@ class S3:
 
         if prefixes is None:
             # List immediate children of s3root
-            list_prefix = self._prefix
-            if list_prefix and not list_prefix.endswith("/"):
-                list_prefix += "/"
+            return self._list_children(self._bucket, self._prefix, self._s3root)
 
-            results = []
-            paginator = self._client.get_paginator("list_objects_v2")
-
-            kwargs = {"Bucket": self._bucket, "Delimiter": "/"}
-            if list_prefix:
-                kwargs["Prefix"] = list_prefix
-
-            for page in paginator.paginate(**kwargs):
-                # Common prefixes (directories)
-                for cp in page.get("CommonPrefixes", []):
-                    cp_prefix = cp["Prefix"]
-                    key = cp_prefix[len(list_prefix):].rstrip("/") if list_prefix else cp_prefix.rstrip("/")
-                    full_url = "s3://%s/%s" % (self._bucket, cp_prefix.rstrip("/"))
-                    obj = S3GetObject(full_url)
-                    obj.key = key
-                    obj.prefix = self._s3root
-                    obj.exists = False
-                    obj.downloaded = False
-                    results.append(obj)
-
-                # Objects (leaves)
-                for content in page.get("Contents", []):
-                    obj_key = content["Key"]
-                    key = obj_key[len(list_prefix):] if list_prefix else obj_key
-                    if not key:
-                        continue
-                    full_url = "s3://%s/%s" % (self._bucket, obj_key)
-                    obj = S3GetObject(full_url)
-                    obj.key = key
-                    obj.prefix = self._s3root
-                    obj.exists = True
-                    obj.downloaded = False
-                    obj.size = content.get("Size", 0)
-                    results.append(obj)
-            return results
-        else:
-            # List under specific prefixes
-            results = []
-            for prefix in prefixes:
-                if prefix.startswith("s3://"):
-                    parsed = urlparse(prefix, allow_fragments=False)
-                    bucket = parsed.netloc
-                    list_prefix = parsed.path.lstrip("/")
-                else:
-                    bucket = self._bucket
-                    list_prefix = "%s/%s" % (self._prefix, prefix) if self._prefix else prefix
+        def _list(prefix):
+            if prefix.startswith("s3://"):
+                parsed = urlsplit(prefix, allow_fragments=False)
+                return self._list_children(
+                    parsed.netloc, parsed.path.lstrip("/"), prefix
+                )
+            return self._list_children(
+                self._bucket, self._prefix_slash + prefix, prefix
+            )
 
-                if list_prefix and not list_prefix.endswith("/"):
-                    list_prefix += "/"
+        # Prefixes are listed concurrently, but returned in order
+        listed = self._run_parallel(_list, list(prefixes))
+        return [obj for objs in listed for obj in objs]
+
+    def _list_children(self, bucket, list_prefix, obj_prefix):
+        """List the objects and prefixes directly under ``list_prefix``."""
+        if list_prefix and not list_prefix.endswith("/"):
+            list_prefix += "/"
+
+        results = []
+        paginator = self._client.get_paginator("list_objects_v2")
+        kwargs = {"Bucket": bucket, "Delimiter": "/"}
+        if list_prefix:
+            kwargs["Prefix"] = list_prefix
+
+        # Loop invariants, hoisted: listings can run to millions of entries
+        bucket_url = "s3://%s/" % bucket
+        n = len(list_prefix)
+        listed = S3GetObject._listed
+        for page in paginator.paginate(**kwargs):
+            # Common prefixes (directories)
+            for cp in page.get("CommonPrefixes", []):
+                cp_prefix = cp["Prefix"].rstrip("/")
+                results.append(listed(
+                    bucket_url + cp_prefix, cp_prefix[n:], obj_prefix, False
+                ))
+
+            # Objects (leaves)
+            for content in page.get("Contents", []):
+                obj_key = content["Key"]
+                key = obj_key[n:]
+                if not key:
+                    continue
+                results.append(listed(
+                    bucket_url + obj_key, key, obj_prefix, True,
+                    content.get("Size", 0),
+                ))
+        return results
 
-                paginator = self._client.get_paginator("list_objects_v2")
-                kwargs = {"Bucket": bucket, "Delimiter": "/"}
-                if list_prefix:
-                    kwargs["Prefix"] = list_prefix
-
-                prefix_url = "s3://%s/%s" % (bucket, list_prefix.rstrip("/")) if list_prefix else "s3://%s" % bucket
-
-                for page in paginator.paginate(**kwargs):
-                    for cp in page.get("CommonPrefixes", []):
-                        cp_key = cp["Prefix"]
-                        key = cp_key[len(list_prefix):].rstrip("/") if list_prefix else cp_key.rstrip("/")
-                        full_url = "s3://%s/%s" % (bucket, cp_key.rstrip("/"))
-                        obj = S3GetObject(full_url)
-                        obj.key = key
-                        obj.prefix = prefix
-                        obj.exists = False
-                        obj.downloaded = False
-                        results.append(obj)
-
-                    for content in page.get("Contents", []):
-                        obj_key = content["Key"]
-                        key = obj_key[len(list_prefix):] if list_prefix else obj_key
-                        if not key:
-                            continue
-                        full_url = "s3://%s/%s" % (bucket, obj_key)
-                        obj = S3GetObject(full_url)
-                        obj.key = key
-                        obj.prefix = prefix
-                        obj.exists = True
-                        obj.downloaded = False
-                        obj.size = content.get("Size", 0)
-                        results.append(obj)
-            return results
-
-    def list_recursive(self, prefixes=None):
-        """List all leaf objects recursively under given prefixes."""
+    def list_recursive(self, prefixes=None, shard_prefixes=None):
+        """List all leaf objects recursively under given prefixes.
+
+        ``shard_prefixes`` (e.g. S3_HEX_SHARDS) splits each listing into
+        one concurrent listing per shard. Only keys that start with one of
+        the shards, after the listed prefix, are found.
+        """
         if self._s3root is None:
             raise MetaflowS3URLException("Cannot list_recursive without s3root")
 
-        if prefixes is None:
-            prefixes = [""]
-
-        results = []
+        prefixes = [""] if prefixes is None else list(prefixes)
+        list_prefixes = []
         for prefix in prefixes:
             if prefix:
-                full_prefix = "%s/%s" % (self._prefix, prefix) if self._prefix else prefix
+                full_prefix = self._prefix_slash + prefix
             else:
                 full_prefix = self._prefix
 
@@ -961,56 +909,29 @@ class S3:
             list_prefix = full_prefix
             if list_prefix and not list_prefix.endswith("/"):
                 list_prefix += "/"
+            list_prefixes.append(list_prefix)
 
-            keys = self._list_objects(self._bucket, list_prefix)
-            for key in sorted(keys):
-                full_url = "s3://%s/%s" % (self._bucket, key)
-                obj = S3GetObject(full_url)
-                obj.key = key[len(self._prefix):].lstrip("/") if self._prefix else key
-                if prefix:
-                    obj.prefix = "%s/%s" % (self._s3root, prefix) if self._s3root else prefix
-                else:
-                    obj.prefix = self._s3root
-                obj.exists = True
-                obj.downloaded = False
-                results.append(obj)
-        return results
-
-    def _list_objects(self, bucket, prefix):
-        """List all object keys under a prefix."""
-        keys = []
-        paginator = self._client.get_paginator("list_objects_v2")
-        kwargs = {"Bucket": bucket}
-        if prefix:
-            kwargs["Prefix"] = prefix
-        for page in paginator.paginate(**kwargs):
-            for content in page.get("Contents", []):
-                keys.append(content["Key"])
-        return keys
+        def _list(list_prefix):
+            return self._list_objects(self._bucket, list_prefix, shard_prefixes)
 
+        if shard_prefixes:
+            # Each listing already fans out over its shards
+            listed = [_list(list_prefix) for list_prefix in list_prefixes]
+        else:
+            listed = self._run_parallel(_list, list_prefixes)
 
-def _build_range_header(offset, size):
-    """Build an HTTP Range header value."""
-    if offset is None and size is None:
-        return None
-    if size is not None and size < 0:
-        # Suffix range: last N bytes
-        return "bytes=%d" % size
-    start = offset if offset is not None else 0
-    if size is not None:
-        end = start + size - 1
-        return "bytes=%d-%d" % (start, end)
-    return "bytes=%d-" % start
-
-
-def _parse_content_range_total(content_range, fallback_size):
-    """Parse total size from Content-Range header."""
-    if content_range:
-        # Format: bytes 0-999/8000
-        parts = content_range.split("/")
-        if len(parts) == 2 and parts[1] != "*":
-            try:
-                return int(parts[1])
-            except ValueError:
-                pass
-    return fallback_size
+        results = []
+        bucket_url = "s3://%s/" % self._bucket
+        key_in_root = self._key_in_root
+        for prefix, keys in zip(prefixes, listed):
+            if prefix:
+                obj_prefix = "%s/%s" % (self._s3root, prefix) if self._s3root else prefix
+            else:
+                obj_prefix = self._s3root
+            # _list_objects returns a fresh list: sort it in place
+            keys.sort()
+            for key in keys:
+                results.append(S3GetObject._listed(
+                    bucket_url + key, key_in_root(key), obj_prefix, True
+                ))
+        return results
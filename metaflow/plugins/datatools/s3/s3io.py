@@ -0,0 +1,306 @@
+"""Transfer and listing helpers behind the Metaflow S3 client.
+
+``_S3Transfer`` is a mixin of S3 holding the retrying, parallel and
+multipart plumbing of its GETs, PUTs and listings; it relies on the S3
+instance's ``_client``, ``_bucket``, ``_prefix_slash``, ``_max_workers``,
+``_head_cache``, ``_conditional_put`` and ``_head_object``.
+"""
+
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .s3op import _parse_content_range_start, _preallocate
+
+# Retry configuration for transient S3 errors
+S3_TRANSIENT_RETRY_COUNT = 7
+S3_TRANSIENT_RETRY_CODES = frozenset(
+    ["SlowDown", "RequestTimeout", "ServiceUnavailable", "InternalError"]
+)
+# Exponential backoff between retries: base * 2**attempt, plus up to
+# S3_RETRY_JITTER of that again, capped at S3_RETRY_MAX_DELAY seconds
+S3_RETRY_BASE_DELAY = 1.0
+S3_RETRY_MAX_DELAY = 30
+S3_RETRY_JITTER = 0.5
+
+# Bodies larger than this are downloaded as concurrent ranged GETs, and
+# uploaded in parts unless the upload is conditional (overwrite=False)
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+# Read size when copying a GET body to disk (botocore's default is 1 KiB)
+S3_COPY_BUFSIZE = 1024 * 1024
+
+
+class _S3Transfer:
+    """Retrying, parallel transfers and listings for S3 (see module docstring)."""
+
+    def _run_parallel(self, fn, items):
+        """Call ``fn`` on each item using up to ``max_workers`` threads.
+
+        Results are returned in input order. The first exception (in input
+        order) is re-raised once work that hasn't started is cancelled.
+        ``items`` may also be an iterator (e.g. a paginated listing), in
+        which case work starts as soon as each item is produced.
+        """
+        workers = self._max_workers
+        if isinstance(items, list):
+            if len(items) <= 1:
+                return [fn(item) for item in items]
+            workers = min(workers, len(items))
+        if workers <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            try:
+                for item in items:
+                    futures.append(executor.submit(fn, item))
+                return [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    def _retry(self, fn, *args, **kwargs):
+        """Call ``fn``, retrying transient S3 errors with backoff and jitter.
+
+        Only errors whose code is in S3_TRANSIENT_RETRY_CODES are retried, up
+        to S3_TRANSIENT_RETRY_COUNT times; anything else (e.g. AccessDenied,
+        NoSuchKey) is raised at once.
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if (
+                    attempt >= S3_TRANSIENT_RETRY_COUNT
+                    or _error_code(e) not in S3_TRANSIENT_RETRY_CODES
+                ):
+                    raise
+            delay = S3_RETRY_BASE_DELAY * 2 ** attempt
+            time.sleep(
+                min(S3_RETRY_MAX_DELAY, delay * (1 + random.random() * S3_RETRY_JITTER))
+            )
+            attempt += 1
+
+    def _download_object(self, bucket, key, local_path, range_header=None):
+        """Download an S3 object to a local file, optionally with range.
+
+        Bodies over S3_MULTIPART_THRESHOLD bytes are split into parts that
+        are fetched concurrently (see _download_parts). Without a
+        ``local_path`` the body is read into memory instead.
+
+        Returns (GET response, body bytes or None if written to disk).
+        """
+        kwargs = {"Bucket": bucket, "Key": key}
+        if range_header:
+            kwargs["Range"] = range_header
+
+        resp = self._retry(self._client.get_object, **kwargs)
+        if local_path is None:
+            return resp, resp["Body"].read()
+        # Write to a private file and rename it into place: the same URL
+        # may be fetched by several workers at once.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(local_path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                length = resp.get("ContentLength") or 0
+                if length > S3_MULTIPART_THRESHOLD:
+                    self._download_parts(resp, f.fileno(), bucket, key, length)
+                else:
+                    shutil.copyfileobj(resp["Body"], f, S3_COPY_BUFSIZE)
+            os.replace(tmp_path, local_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return resp, None
+
+    def _download_parts(self, resp, fd, bucket, key, length):
+        """Write the ``length``-byte body of ``resp`` to ``fd``.
+
+        The first part is read from the response already open; the others
+        are ranged GETs pinned to the same ETag, run in parallel and each
+        written at its own offset of the preallocated file.
+        """
+        start = _parse_content_range_start(resp.get("ContentRange"))
+        etag = resp.get("ETag")
+        _preallocate(fd, length)
+        first = resp["Body"].read(S3_MULTIPART_CHUNKSIZE)
+        resp["Body"].close()
+        os.pwrite(fd, first, 0)
+
+        def _fetch_part(offset):
+            end = min(offset + S3_MULTIPART_CHUNKSIZE, length) - 1
+            kwargs = {
+                "Bucket": bucket,
+                "Key": key,
+                "Range": "bytes=%d-%d" % (start + offset, start + end),
+            }
+            if etag:
+                kwargs["IfMatch"] = etag
+            part = self._retry(self._client.get_object, **kwargs)
+            for chunk in part["Body"].iter_chunks(S3_COPY_BUFSIZE):
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+
+        self._run_parallel(
+            _fetch_part, list(range(len(first), length, S3_MULTIPART_CHUNKSIZE))
+        )
+
+    def _upload(self, full_key, extra, body=None, path=None, overwrite=True):
+        """PUT ``body``, or the local file at ``path``, to ``full_key``.
+
+        Without ``overwrite`` the PUT is made conditional on the key not
+        existing (If-None-Match: *) instead of being preceded by a HEAD;
+        providers that reject the condition get the HEAD. Returns False if
+        the key already existed and was left alone.
+        """
+        if self._head_cache is not None:
+            self._head_cache.pop((self._bucket, full_key), None)
+        if overwrite:
+            self._retry(self._put_object, full_key, extra, body, path)
+            return True
+        if self._conditional_put:
+            try:
+                self._retry(
+                    self._put_object, full_key, dict(extra, IfNoneMatch="*"),
+                    body, path,
+                )
+                return True
+            except Exception as e:
+                error_code = _error_code(e)
+                if error_code in ("PreconditionFailed", "412"):
+                    return False
+                if error_code not in ("NotImplemented", "501"):
+                    raise
+                self._conditional_put = False
+        if self._head_object(self._bucket, full_key) is not None:
+            return False
+        self._retry(self._put_object, full_key, extra, body, path)
+        return True
+
+    def _existing_keys(self, items):
+        """Full keys of put_many/put_files ``items`` that already exist.
+
+        Found with one listing of the range between the smallest and largest
+        key, instead of a request per key. If that range holds many more
+        objects than ``items``, gives up and returns an empty set: the
+        uploads are conditional anyway (see _upload).
+        """
+        wanted = set()
+        for item in items:
+            # (key, value) tuples or S3PutObjects
+            if isinstance(item, tuple):
+                key = item[0] if item else None
+            else:
+                key = getattr(item, "key", None)
+            if isinstance(key, str):
+                wanted.add(self._prefix_slash + key)
+        if not wanted:
+            return set()
+        first, last = min(wanted), max(wanted)
+        kwargs = {"Bucket": self._bucket, "PaginationConfig": {"PageSize": 1000}}
+        prefix = os.path.commonprefix([first, last])
+        if prefix:
+            kwargs["Prefix"] = prefix
+        if len(first) > 1:
+            # Exclusive, and sorts just before first
+            kwargs["StartAfter"] = first[:-1]
+        budget = 2 * len(wanted) + 1000
+        found = set()
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(**kwargs):
+            for content in page.get("Contents", []):
+                key = content["Key"]
+                if key > last:
+                    return found
+                if key in wanted:
+                    found.add(key)
+            budget -= len(page.get("Contents", []))
+            if budget < 0:
+                return set()
+        return found
+
+    def _put_object(self, full_key, extra, body, path):
+        # upload_fileobj splits bodies over S3_MULTIPART_THRESHOLD into
+        # concurrent parts but can't send If-None-Match, so conditional PUTs
+        # stay single.
+        conditional = "IfNoneMatch" in extra
+        if path is None:
+            if conditional or len(body) <= S3_MULTIPART_THRESHOLD:
+                return self._client.put_object(
+                    Bucket=self._bucket, Key=full_key, Body=body, **extra
+                )
+            return self._upload_fileobj(io.BytesIO(body), full_key, extra)
+        # Files are streamed, never read into memory, and reopened on every
+        # (re)try.
+        with open(path, "rb") as f:
+            if conditional:
+                return self._client.put_object(
+                    Bucket=self._bucket, Key=full_key, Body=f, **extra
+                )
+            return self._upload_fileobj(f, full_key, extra)
+
+    def _upload_fileobj(self, f, full_key, extra):
+        from boto3.s3.transfer import TransferConfig
+        self._client.upload_fileobj(
+            f, self._bucket, full_key, ExtraArgs=extra,
+            Config=TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD,
+                multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+                max_concurrency=self._max_workers,
+            ),
+        )
+
+    def _list_objects(self, bucket, prefix, shard_prefixes=None):
+        """List all object keys under a prefix.
+
+        With ``shard_prefixes``, ``prefix + shard`` is listed for every
+        shard concurrently instead.
+        """
+        if shard_prefixes:
+            shards = sorted(set(prefix + shard for shard in shard_prefixes))
+            listed = self._run_parallel(
+                lambda shard: self._list_objects(bucket, shard), shards
+            )
+            # Overlapping shards (e.g. "a" and "ab") list some keys twice
+            return list(dict.fromkeys(key for keys in listed for key in keys))
+
+        return list(self._iter_objects(bucket, prefix))
+
+    def _iter_objects(self, bucket, prefix):
+        """Yield object keys under a prefix, one listing page at a time."""
+        paginator = self._client.get_paginator("list_objects_v2")
+        kwargs = {"Bucket": bucket, "PaginationConfig": {"PageSize": 1000}}
+        if prefix:
+            kwargs["Prefix"] = prefix
+        for page in paginator.paginate(**kwargs):
+            for content in page.get("Contents", []):
+                yield content["Key"]
+
+
+def _relative_key_fn(root):
+    """Return a function giving a URL or key relative to ``root``.
+
+    Names outside ``root`` (or any name, without a root) come back as is.
+    """
+    if not root:
+        return lambda name: name
+    n = len(root)
+
+    def _relative_key(name):
+        if name.startswith(root):
+            return name[n:].lstrip("/")
+        return name
+
+    return _relative_key
+
+
+def _error_code(e):
+    """Return the S3 error code of a botocore ClientError, or ''."""
+    return getattr(e, "response", {}).get("Error", {}).get("Code", "")
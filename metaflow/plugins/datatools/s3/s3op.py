@@ -1,18 +1,41 @@
 """S3 operation utilities.
 
-Provides helper functions for S3 operations including error conversion
-and local path generation for downloaded files.
+Provides helper functions for S3 operations including error conversion,
+local path generation and preallocation for downloaded files, Range header
+handling, and encoding of user metadata.
 """
 
+import errno
+import json
+import os
 import re
 from hashlib import sha1
 
 from metaflow.util import url_quote
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+else:
+    # Types json.dumps rejects must make orjson raise too, not be stringified.
+    _ORJSON_METADATA_OPTS = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
 
 # Maximum filename length on most filesystems
 MAX_FILENAME_LENGTH = 255
 
+# Parts of a boto error string, see convert_to_client_error
+_ERR_CODE_RE = re.compile(r"An error occurred \(([^)]+)\)")
+_ERR_OP_RE = re.compile(r"when calling the (\S+) operation")
+_ERR_MSG_RE = re.compile(r"\): (.+)$")
+
+# botocore's ClientError, or _FakeClientError without botocore; resolved on
+# first use so that importing this module doesn't import botocore
+_client_error_cls = None
+
 
 class _FakeClientError(Exception):
     """Mimics botocore.exceptions.ClientError structure."""
@@ -23,6 +46,17 @@ class _FakeClientError(Exception):
         super().__init__(str(response))
 
 
+def _client_error():
+    global _client_error_cls
+    if _client_error_cls is None:
+        try:
+            from botocore.exceptions import ClientError
+        except ImportError:
+            ClientError = _FakeClientError
+        _client_error_cls = ClientError
+    return _client_error_cls
+
+
 def convert_to_client_error(error_string):
     """Convert an S3 error string to a ClientError-like object.
 
@@ -35,35 +69,24 @@ def convert_to_client_error(error_string):
     and .operation_name attributes.
     """
     # Extract error code from (ErrorCode)
-    code_match = re.search(r"An error occurred \(([^)]+)\)", error_string)
+    code_match = _ERR_CODE_RE.search(error_string)
     error_code = code_match.group(1) if code_match else "Unknown"
 
     # Extract operation name from "calling the X operation"
-    op_match = re.search(r"when calling the (\S+) operation", error_string)
+    op_match = _ERR_OP_RE.search(error_string)
     operation_name = op_match.group(1) if op_match else "Unknown"
 
     # Extract message after the last ": "
-    msg_match = re.search(r"\): (.+)$", error_string)
+    msg_match = _ERR_MSG_RE.search(error_string)
     message = msg_match.group(1) if msg_match else error_string
 
-    try:
-        from botocore.exceptions import ClientError
-
-        response = {
-            "Error": {
-                "Code": error_code,
-                "Message": message,
-            }
-        }
-        return ClientError(response, operation_name)
-    except ImportError:
-        response = {
-            "Error": {
-                "Code": error_code,
-                "Message": message,
-            }
+    response = {
+        "Error": {
+            "Code": error_code,
+            "Message": message,
         }
-        return _FakeClientError(response, operation_name)
+    }
+    return _client_error()(response, operation_name)
 
 
 def generate_local_path(url, range=None, suffix=None):
@@ -121,3 +144,86 @@ def generate_local_path(url, range=None, suffix=None):
         result = "-".join(parts_trunc)
 
     return result[:MAX_FILENAME_LENGTH]
+
+
+def _preallocate(fd, length):
+    """Size the file ``fd`` to ``length`` bytes, reserving its blocks.
+
+    Reserved blocks keep out-of-order part writes from fragmenting the file
+    and make a full disk fail here rather than halfway through. Falls back
+    to a sparse file where the filesystem can't reserve space.
+    """
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, length)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOSYS):
+                raise
+    os.ftruncate(fd, length)
+
+
+def _build_range_header(offset, size):
+    """Build an HTTP Range header value."""
+    if offset is None and size is None:
+        return None
+    if size is not None and size < 0:
+        # Suffix range: last N bytes
+        return "bytes=%d" % size
+    start = offset if offset is not None else 0
+    if size is not None:
+        end = start + size - 1
+        return "bytes=%d-%d" % (start, end)
+    return "bytes=%d-" % start
+
+
+def _parse_content_range_start(content_range):
+    """Parse the first byte offset from a Content-Range header."""
+    if content_range:
+        # Format: bytes 0-999/8000
+        try:
+            return int(content_range.split(" ")[-1].split("-")[0])
+        except ValueError:
+            pass
+    return 0
+
+
+def _parse_content_range_total(content_range, fallback_size):
+    """Parse total size from Content-Range header."""
+    if content_range:
+        # Format: bytes 0-999/8000
+        parts = content_range.split("/")
+        if len(parts) == 2 and parts[1] != "*":
+            try:
+                return int(parts[1])
+            except ValueError:
+                pass
+    return fallback_size
+
+
+def _dumps_metadata(metadata):
+    """Serialize user metadata for the metaflow-user-attributes header."""
+    if orjson is not None:
+        try:
+            raw = orjson.dumps(metadata, option=_ORJSON_METADATA_OPTS)
+        except TypeError:
+            raw = None
+        # orjson only stands in for json.dumps when the result is the same:
+        # it must be ASCII (header values; json escapes the rest) and decode
+        # back to an equal value, which rules out what orjson writes but
+        # json.dumps doesn't (NaN/Infinity as null, UUIDs, enums, tuples,
+        # non-str keys). Those take the json.dumps path below.
+        if raw is not None and raw.isascii() and orjson.loads(raw) == metadata:
+            return raw.decode("ascii")
+    return json.dumps(metadata)
+
+
+def _loads_metadata(raw):
+    """Parse the metaflow-user-attributes header written by _dumps_metadata."""
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except ValueError:
+            # e.g. NaN, which json writes but orjson rejects
+            pass
+    return json.loads(raw)
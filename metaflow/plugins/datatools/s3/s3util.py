@@ -1,6 +1,26 @@
 """S3 utility functions for creating boto3 clients."""
 
+import hashlib
 import os
+import threading
+import weakref
+
+from metaflow.util import to_bytes
+
+# Environment that decides which credentials a boto3 Session resolves
+_CREDENTIAL_ENV = (
+    "AWS_ACCESS_KEY_ID",
+    "AWS_SECRET_ACCESS_KEY",
+    "AWS_SESSION_TOKEN",
+    "AWS_PROFILE",
+    "AWS_DEFAULT_PROFILE",
+    "AWS_SHARED_CREDENTIALS_FILE",
+    "AWS_CONFIG_FILE",
+)
+
+# _ClientPool by (region, endpoint_url, max_pool_connections, credentials)
+_clients = {}
+_clients_lock = threading.Lock()
 
 
 def get_s3_client():
@@ -29,3 +49,120 @@ def get_s3_client():
     resource = session.resource("s3", **kwargs)
 
     return client, resource
+
+
+def get_client_pool(region, endpoint_url, pool_size):
+    """Return the shared _ClientPool for these settings.
+
+    Pools are reused across S3 contexts so connections stay warm, as long
+    as the credential source (see _credential_source) is unchanged. When it
+    changes, e.g. rotated keys or another AWS_PROFILE, a new pool with a
+    fresh Session replaces the old one.
+    """
+    key = (region, endpoint_url, pool_size, _credential_source())
+    with _clients_lock:
+        pool = _clients.get(key)
+        if pool is None:
+            for stale in [k for k in _clients if k[:3] == key[:3]]:
+                del _clients[stale]
+            pool = _clients[key] = _ClientPool(region, endpoint_url, pool_size)
+    return pool
+
+
+def _credential_source():
+    """Digest of the environment and files boto3 reads credentials from."""
+    parts = [os.environ.get(name) for name in _CREDENTIAL_ENV]
+    for path in (
+        os.environ.get("AWS_SHARED_CREDENTIALS_FILE", "~/.aws/credentials"),
+        os.environ.get("AWS_CONFIG_FILE", "~/.aws/config"),
+    ):
+        try:
+            parts.append(os.stat(os.path.expanduser(path)).st_mtime_ns)
+        except OSError:
+            parts.append(None)
+    # Hashed so that keys of _clients don't hold secrets
+    return hashlib.sha256(to_bytes(repr(parts))).hexdigest()
+
+
+class _ClientLease(object):
+    __slots__ = ("client", "paginators", "__weakref__")
+
+    def __init__(self, client, paginators):
+        self.client = client
+        self.paginators = paginators
+
+
+class _ClientPool(object):
+    """boto3 S3 clients for one region/endpoint, used one per thread.
+
+    Clients are created from a shared Session, so credentials are resolved
+    once per pool (get_client_pool replaces the pool when their source
+    changes). A thread keeps its client until it exits, then the client goes
+    back to the pool for the next thread: the short-lived workers of
+    S3._run_parallel reuse warm connections instead of opening new ones.
+    Attribute access is forwarded to the calling thread's client.
+    """
+
+    def __init__(self, region, endpoint_url, pool_size):
+        self._region = region
+        self._endpoint_url = endpoint_url
+        self._pool_size = pool_size
+        self._session = None
+        # (client, paginators by operation name) of exited threads
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _lease(self):
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            with self._lock:
+                if self._idle:
+                    client, paginators = self._idle.pop()
+                else:
+                    if self._session is None:
+                        import boto3
+                        self._session = boto3.session.Session()
+                    client = _new_client(
+                        self._session, self._region, self._endpoint_url,
+                        self._pool_size,
+                    )
+                    paginators = {}
+            lease = self._local.lease = _ClientLease(client, paginators)
+            # Thread-local data is dropped when the thread exits
+            weakref.finalize(lease, self._idle.append, (client, paginators))
+        return lease
+
+    def client(self):
+        return self._lease().client
+
+    def get_paginator(self, operation_name):
+        # botocore builds a new paginator class on every get_paginator call
+        paginators = self._lease().paginators
+        paginator = paginators.get(operation_name)
+        if paginator is None:
+            paginator = paginators[operation_name] = self.client().get_paginator(
+                operation_name
+            )
+        return paginator
+
+    def __getattr__(self, name):
+        return getattr(self.client(), name)
+
+
+def _new_client(session, region, endpoint_url, pool_size):
+    """Create a boto3 S3 client with a keep-alive connection pool."""
+    from botocore.config import Config
+    config = Config(
+        max_pool_connections=pool_size,
+        # botocore's own retries stay short: S3._retry adds up to
+        # S3_TRANSIENT_RETRY_COUNT backed-off retries on top of them.
+        retries={"mode": "standard"},
+        tcp_keepalive=True,
+        connect_timeout=5,
+        read_timeout=60,
+    )
+    kwargs = {"region_name": region, "config": config}
+    if endpoint_url:
+        kwargs["endpoint_url"] = endpoint_url
+    return session.client("s3", **kwargs)
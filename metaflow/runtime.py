@@ -1032,8 +1032,8 @@ class Runtime:
             namespace="user:%s" % username,
             username=username,
             parameter_names=param_names,
-            user_tags=tuple(self.tags),
-            sys_tags=tuple(self.sys_tags),
+            user_tags=frozenset(self.tags),
+            sys_tags=frozenset(self.sys_tags),
             parallel_num_nodes=parallel_total if parallel_index is not None else 1,
             parallel_node_index=parallel_index if parallel_index is not None else 0,
             project_name=getattr(self.flow_cls, "_project_name", None),
@@ -2,6 +2,8 @@
 
 import json
 
+from ..parameters import FlowAttributeDescriptor
+
 
 class ConfigValue(dict):
     """Immutable dict subclass with attribute access. Wraps nested dicts."""
@@ -130,7 +132,7 @@ class _DeferredConfigAttr:
         return "_DeferredConfigAttr(%s)" % self._expr
 
 
-class Config:
+class Config(FlowAttributeDescriptor):
     """Config descriptor for FlowSpec classes."""
 
     def __init__(self, name, default=None, default_value=None,
@@ -10,6 +10,21 @@ def is_stringish(x):
     return isinstance(x, (str, bytes))
 
 
+def iter_class_attrs(cls):
+    """Yield ``(name, raw_value)`` for every attribute visible on ``cls``.
+
+    Walks the MRO's class dicts directly: unlike ``dir()`` + ``getattr`` it
+    neither sorts nor invokes descriptors, and a subclass entry shadows the
+    same name further up the hierarchy.
+    """
+    seen = set()
+    for klass in cls.__mro__:
+        for name, value in vars(klass).items():
+            if name not in seen:
+                seen.add(name)
+                yield name, value
+
+
 def get_username():
     """Get username from METAFLOW_USER or USER env var."""
     return os.environ.get("METAFLOW_USER", os.environ.get("USER", "unknown"))
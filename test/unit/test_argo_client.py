@@ -0,0 +1,218 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from metaflow.plugins.argo import _http, argo_client
+from metaflow.plugins.argo.argo_client import ArgoClient
+from metaflow.plugins.argo.argo_events_client import ArgoEventsClient
+
+
+class _ArgoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/api/v1/workflows/paged":
+            query = parse_qs(url.query)
+            self.server.queries.append(query)
+            page = int(query.get("listOptions.continue", ["0"])[0])
+            items = [{"metadata": {"name": "wf-%d" % page}}]
+            meta = {"continue": str(page + 1)} if page < 2 else {}
+            self._reply(200, {"items": items, "metadata": meta})
+        elif "/missing" in url.path:
+            self._reply(404, {"message": "not found"})
+        elif url.path.endswith("/log"):
+            body = b"".join(
+                json.dumps({"result": {"content": "line %d" % i}}).encode() + b"\n"
+                for i in range(3)
+            )
+            self.send_response(200)
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._reply(200, {"path": self.path})
+
+    def do_POST(self):
+        self.server.posts += 1
+        length = int(self.headers["Content-Length"])
+        self._reply(200, json.loads(self.rfile.read(length)))
+
+    def do_PUT(self):
+        self.server.puts += 1
+        self._reply(503, {"message": "unavailable"})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def argo_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ArgoHandler)
+    server.connections = 0
+    server.queries = []
+    server.posts = 0
+    server.puts = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_connection(argo_server):
+    client = ArgoClient(
+        server_url="http://127.0.0.1:%d" % argo_server.server_port, namespace="ns"
+    )
+    assert client.get_workflow("wf")["path"] == "/api/v1/workflows/ns/wf"
+    spec = {"metadata": {"name": "wf"}}
+    assert client.submit_workflow(spec) == {"workflow": spec}
+    client.get_workflow("wf")
+    assert argo_server.connections == 1
+
+
+def test_submit_workflows_keeps_order(argo_server):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    specs = [{"metadata": {"name": "wf-%d" % i}} for i in range(6)]
+    responses = client.submit_workflows(specs, max_in_flight=3)
+    assert responses == [{"workflow": spec} for spec in specs]
+
+
+def test_submit_workflow_cached(argo_server, tmp_path):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    cache = str(tmp_path / "cache.json")
+    spec = {"metadata": {"name": "wf"}}
+    assert client.submit_workflow_cached(spec, cache_path=cache) == {"workflow": spec}
+    posts = argo_server.posts
+    assert client.submit_workflow_cached(spec, cache_path=cache) == {"workflow": spec}
+    assert argo_server.posts == posts
+    client.submit_workflow_cached(spec, max_age=0, cache_path=cache)
+    client.submit_workflow_cached({"metadata": {"name": "other"}}, cache_path=cache)
+    assert argo_server.posts == posts + 2
+
+
+def test_submit_workflow_cache_is_pruned(argo_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(argo_client, "_SUBMIT_CACHE_MAX_ENTRIES", 2)
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    cache = tmp_path / "cache.json"
+    cache.write_text(json.dumps({"stale": {"ts": 0, "response": {}}}))
+    for i in range(3):
+        client.submit_workflow_cached(
+            {"metadata": {"name": "wf-%d" % i}}, cache_path=str(cache)
+        )
+    entries = json.loads(cache.read_text())
+    assert "stale" not in entries
+    assert [e["response"]["workflow"]["metadata"]["name"] for e in
+            sorted(entries.values(), key=lambda e: e["ts"])] == ["wf-1", "wf-2"]
+
+
+def test_submit_workflow_cache_malformed_entry_is_a_miss(argo_server, tmp_path):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    cache = tmp_path / "cache.json"
+    spec = {"metadata": {"name": "wf"}}
+    client.submit_workflow_cached(spec, cache_path=str(cache))
+    (key,) = json.loads(cache.read_text())
+    for entry in ({"response": {"stale": True}}, {"ts": 1}, "junk"):
+        cache.write_text(json.dumps({key: entry}))
+        posts = argo_server.posts
+        assert client.submit_workflow_cached(
+            spec, max_age=60, cache_path=str(cache)
+        ) == {"workflow": spec}
+        assert argo_server.posts == posts + 1
+
+
+def test_list_workflows_pages(argo_server):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    names = [
+        wf["metadata"]["name"]
+        for wf in client.iter_workflows(
+            "paged", label_selector="a=b", limit=1, fields="metadata.name"
+        )
+    ]
+    assert names == ["wf-0", "wf-1", "wf-2"]
+    first = argo_server.queries[0]
+    assert first["listOptions.labelSelector"] == ["a=b"]
+    assert first["listOptions.limit"] == ["1"]
+    assert first["fields"] == ["metadata.continue,items.metadata.name"]
+    workflows = client.list_workflows("paged", limit=1)
+    assert isinstance(workflows, list) and len(workflows) == 3
+
+
+def test_workflow_logs_stream(argo_server):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    logs = client.get_workflow_logs("wf")
+    assert [r["result"]["content"] for r in logs] == ["line 0", "line 1", "line 2"]
+    with pytest.raises(RuntimeError, match="Argo API error 404"):
+        list(client.iter_workflow_logs("missing"))
+
+
+def test_http2_backend(argo_server, monkeypatch):
+    pytest.importorskip("h2")
+    monkeypatch.setenv("METAFLOW_ARGO_HTTP2", "1")
+    monkeypatch.setattr(_http, "_http2", None)
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    spec = {"metadata": {"name": "wf"}}
+    assert client.submit_workflow(spec) == {"workflow": spec}
+    assert len(client.get_workflow_logs("wf")) == 3
+    with pytest.raises(RuntimeError, match="Argo API error 404"):
+        client.get_workflow("missing")
+    assert _http._http2 is not None
+    _http._http2.close()
+
+
+def test_clients_share_pool(argo_server):
+    url = "http://127.0.0.1:%d" % argo_server.server_port
+    ArgoClient(server_url=url).get_workflow("wf")
+    events = ArgoEventsClient(server_url=url)
+    assert events._request("POST", "/api/v1/sensors", {"a": 1}) == {"a": 1}
+    assert argo_server.connections == 1
+
+
+def test_create_sensors_bulk(argo_server):
+    events = ArgoEventsClient(
+        server_url="http://127.0.0.1:%d" % argo_server.server_port, namespace="ns"
+    )
+    results = events.create_sensors_bulk([
+        ("cron", "FlowA", "0 9 * * *", "flow-a"),
+        ("bogus", "FlowB", "x", "flow-b"),
+        ("webhook", "FlowC", "/hook", "flow-c"),
+    ])
+    assert results[0]["sensor"]["metadata"]["name"] == "metaflow-flowa-cron"
+    assert isinstance(results[1], ValueError)
+    assert results[2]["sensor"]["metadata"]["name"] == "metaflow-flowc-webhook"
+    assert argo_server.posts == 4
+
+
+def test_error_status_raises(argo_server):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    with pytest.raises(RuntimeError, match="Argo API error 404"):
+        client.get_workflow("missing")
+    events = ArgoEventsClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    with pytest.raises(RuntimeError, match="Argo Events API error 404"):
+        events._request("GET", "/missing")
+
+
+def test_put_is_not_retried(argo_server):
+    client = ArgoClient(server_url="http://127.0.0.1:%d" % argo_server.server_port)
+    with pytest.raises(RuntimeError, match="Argo API error 503"):
+        client.resubmit_workflow("wf")
+    assert argo_server.puts == 1
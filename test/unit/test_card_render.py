@@ -0,0 +1,61 @@
+import shutil
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from metaflow.decorators import (
+    CardDecorator,
+    _discard_render_pool,
+    _get_render_pool,
+)
+
+
+def test_render_pool_returns_results_and_errors():
+    pool = _get_render_pool()
+    assert pool.submit(lambda x: x * 2, 21).result(timeout=5) == 42
+
+    def boom():
+        raise ValueError("bad card")
+
+    with pytest.raises(ValueError, match="bad card"):
+        pool.submit(boom).result(timeout=5)
+
+
+def test_hung_render_does_not_block_exit():
+    # A render stuck past its timeout must not keep the interpreter alive.
+    script = (
+        "import time\n"
+        "from concurrent.futures import TimeoutError\n"
+        "from metaflow.decorators import _discard_render_pool, _get_render_pool\n"
+        "fut = _get_render_pool().submit(time.sleep, 60)\n"
+        "try:\n"
+        "    fut.result(timeout=0.1)\n"
+        "except TimeoutError:\n"
+        "    _discard_render_pool()\n"
+    )
+    start = time.time()
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+    assert time.time() - start < 20
+
+
+def test_discard_starts_a_fresh_worker():
+    first = _get_render_pool()
+    _discard_render_pool()
+    assert _get_render_pool() is not first
+
+
+def test_card_dir_recreated_after_removal(tmp_path, monkeypatch):
+    monkeypatch.setenv("METAFLOW_DATASTORE_SYSROOT_LOCAL", str(tmp_path))
+    indexes = iter(range(10))
+    current = SimpleNamespace(
+        pathspec="F/1/start/2",
+        card=SimpleNamespace(_allocate_card_index=lambda: next(indexes)),
+    )
+    card_dir = tmp_path / "F" / "1" / "start" / "2" / "cards"
+    CardDecorator._write_card_file(current, "blank", None, "<p>a</p>")
+    shutil.rmtree(card_dir)
+    CardDecorator._write_card_file(current, "blank", None, "<p>b</p>")
+    assert (card_dir / "1.html").read_text() == "<p>b</p>"
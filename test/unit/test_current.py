@@ -0,0 +1,20 @@
+import pytest
+
+from metaflow.metaflow_current import Current, TaskContext
+
+
+def test_task_context_is_read_only():
+    current = Current()
+    current.bind(TaskContext("F", "1", "start", "2"))
+    assert current.pathspec == "F/1/start/2"
+    with pytest.raises(AttributeError, match="read-only"):
+        current.run_id = "9"
+    assert current.pathspec == "F/1/start/2"
+
+    current._update(project_name="p")
+    assert current.project_name == "p"
+    current.bind_retry(3)
+    assert current.retry_count == 3
+    # Extensions may still attach their own attributes
+    current.extra = 1
+    assert current.extra == 1
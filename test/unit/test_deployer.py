@@ -0,0 +1,156 @@
+import json
+import sys
+from unittest import mock
+
+import pytest
+
+from metaflow.deployer import Deployer, _DeployDaemon, _run_subprocess
+
+
+def _fake_run(cmd, **kwargs):
+    return 0, ("%s:%s" % (cmd[-3], cmd[-1])).encode(), b""
+
+
+def test_map_preserves_order():
+    deployments = [
+        Deployer("flow_%d.py" % i).argo_workflows(name="wf%d" % i) for i in range(5)
+    ]
+    with mock.patch("metaflow.deployer._run_subprocess", side_effect=_fake_run):
+        results = Deployer.map("status", deployments, max_workers=3)
+    assert results == ["status:wf%d" % i for i in range(5)]
+
+
+def test_map_empty():
+    assert Deployer.map("create", []) == []
+
+
+def test_map_reraises_failure():
+    deployments = [Deployer("flow.py").argo_workflows(name="wf")]
+    with mock.patch(
+        "metaflow.deployer._run_subprocess", return_value=(1, b"", b"boom")
+    ):
+        with pytest.raises(RuntimeError):
+            Deployer.map("trigger", deployments)
+
+
+def test_run_subprocess_bounds_stderr():
+    script = (
+        "import sys; sys.stdout.write('out'); "
+        "sys.stderr.write('x' * 200000 + 'END')"
+    )
+    returncode, out, err = _run_subprocess([sys.executable, "-c", script])
+    assert returncode == 0
+    assert out == b"out"
+    assert err.endswith(b"END") and len(err) <= 64 * 1024
+
+
+def test_env_inherited_without_extras():
+    deployment = Deployer("flow.py").argo_workflows(name=None)
+    with mock.patch(
+        "metaflow.deployer._run_subprocess", return_value=(0, b"", b"")
+    ) as run:
+        deployment.status()
+        assert run.call_args.kwargs["env"] is None
+        deployment.status(name="wf")
+        assert run.call_args.kwargs["env"]["name"] == "wf"
+
+
+def test_delete_returns_output():
+    deployment = Deployer("flow.py").argo_workflows()
+    with mock.patch(
+        "metaflow.deployer._run_subprocess", return_value=(0, b"deleted", b"")
+    ):
+        assert deployment.delete() == "deleted"
+
+
+_DAEMON_FLOW = """
+from metaflow import FlowSpec, step
+
+
+class DaemonFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+if __name__ == "__main__":
+    DaemonFlow()
+"""
+
+
+def test_daemon_serves_repeated_calls(tmp_path):
+    flow_file = tmp_path / "daemon_flow.py"
+    flow_file.write_text(_DAEMON_FLOW)
+    deployment = Deployer(str(flow_file), daemon=True).argo_workflows()
+    try:
+        first = deployment._run_command("show")
+        proc = deployment._daemon._proc
+        assert deployment._run_command("show") == first
+        assert "start -> ['end']" in first
+        assert deployment._daemon._proc is proc
+        with pytest.raises(RuntimeError):
+            deployment._run_command("no-such-command")
+    finally:
+        deployment._daemon.close()
+
+
+def test_daemon_survives_bad_request(tmp_path):
+    flow_file = tmp_path / "daemon_flow.py"
+    flow_file.write_text(_DAEMON_FLOW)
+    daemon = _DeployDaemon(str(flow_file))
+    try:
+        daemon.request(["show"], {})
+        proc = daemon._proc
+        for bad in ("{not json\n", "[1, 2]\n"):
+            proc.stdin.write(bad)
+            proc.stdin.flush()
+            resp = json.loads(proc.stdout.readline())
+            assert resp["rc"] == 1
+            assert "Bad daemon request" in resp["err"]
+        rc, out, _ = daemon.request(["show"], {})
+        assert rc == 0 and "start -> ['end']" in out
+        assert daemon._proc is proc
+    finally:
+        daemon.close()
+
+
+_PARAM_FLOW = """
+from metaflow import FlowSpec, Parameter, step
+
+
+class ParamFlow(FlowSpec):
+    alpha = Parameter("alpha", default=1)
+
+    @step
+    def start(self):
+        with open("alphas.txt", "a") as f:
+            f.write("%s\\n" % self.alpha)
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+if __name__ == "__main__":
+    ParamFlow()
+"""
+
+
+def test_daemon_requests_do_not_leak_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    flow_file = tmp_path / "param_flow.py"
+    flow_file.write_text(_PARAM_FLOW)
+    daemon = _DeployDaemon(str(flow_file))
+    try:
+        rc, _, err = daemon.request(["run", "--alpha", "7"], {})
+        assert rc == 0, err
+        rc, _, err = daemon.request(["run"], {})
+        assert rc == 0, err
+    finally:
+        daemon.close()
+    assert (tmp_path / "alphas.txt").read_text().split() == ["7", "1"]
@@ -0,0 +1,106 @@
+import pickle
+
+import pytest
+
+from metaflow import FlowSpec, step
+
+
+class _StateFlow(FlowSpec):
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+def _flow(**artifacts):
+    flow = _StateFlow._create_instance(None)
+    flow._artifacts.update(artifacts)
+    return flow
+
+
+def test_persistable_state_does_not_touch_artifacts():
+    flow = _flow(x=1)
+    state = flow.get_persistable_state(task_ok=True)
+    assert dict(state) == {"x": 1, "_task_ok": True, "_foreach_stack": []}
+    state["_graph_info"] = {}
+    assert flow._artifacts == {"x": 1}
+
+
+def test_pickle_ships_task_state_only():
+    flow = _flow(x=[1, 2])
+    flow.set_foreach_context("a", 0, [])
+    flow._scratch = 3
+    clone = pickle.loads(pickle.dumps(flow))
+    assert type(clone) is _StateFlow
+    assert clone.x == [1, 2]
+    assert (clone._input, clone._index) == ("a", 0)
+    assert clone._scratch == 3
+    assert clone._graph is _StateFlow._get_graph()
+
+
+def test_dict_switch_transition():
+    flow = _flow()
+    flow.next({"a": flow.start, "b": flow.end}, condition="choice")
+    transition = flow.get_transition()
+    assert transition.switch_map == {"a": "start", "b": "end"}
+    assert transition.resolve_switch_target("b") == "end"
+    assert transition.resolve_switch_target("c") == "c"
+
+
+class _ConstFlow(FlowSpec):
+    LIMIT = 3
+
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+def test_immutable_attr_errors():
+    flow = _ConstFlow._create_instance(None)
+    flow.bind_class_vars()
+    flow.bind_params({"alpha": 0.5})
+    with pytest.raises(AttributeError, match="Cannot modify class variable 'LIMIT'"):
+        flow.LIMIT = 4
+    with pytest.raises(AttributeError, match="Cannot modify parameter/config 'alpha'"):
+        flow.alpha = 1.0
+    flow.x = 1
+    assert flow._artifacts["x"] == 1
+
+
+class _ShadowFlow(FlowSpec):
+    x = None
+    helper = len
+
+    @step
+    def start(self):
+        self.next(self.end)
+
+    @step
+    def end(self):
+        pass
+
+
+def test_artifacts_shadow_none_and_callable_class_attrs():
+    flow = _ShadowFlow._create_instance(None)
+    assert flow.x is None and flow.helper is len
+    flow.x = 5
+    flow.helper = "artifact"
+    assert (flow.x, flow.helper) == (5, "artifact")
+    assert flow._artifacts == {"x": 5, "helper": "artifact"}
+    clone = pickle.loads(pickle.dumps(flow))
+    assert (clone.x, clone.helper) == (5, "artifact")
+    del flow.helper
+    assert flow.helper is len
+
+    child = _ShadowFlow._create_instance(None)
+    child.load_parent_state({"x": 7, "helper": "parent"})
+    assert (child.x, child.helper) == (7, "parent")
+    child.reset_for_retry({})
+    assert child.x is None and child.helper is len
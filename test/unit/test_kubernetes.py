@@ -1,6 +1,10 @@
+import os
+import tarfile
+
 import pytest
 
 from metaflow.plugins.kubernetes.kubernetes import KubernetesException
+from metaflow.plugins.kubernetes.kubernetes_executor import _add_file_to_tarball
 
 from metaflow.plugins.kubernetes.kube_utils import (
     validate_kube_labels,
@@ -96,3 +100,27 @@ def test_kubernetes_parse_keyvalue_list(items, requires_both, expected):
 def test_kubernetes_parse_keyvalue_list(items, requires_both):
     with pytest.raises(KubernetesException):
         parse_kube_keyvalue_list(items, requires_both)
+
+
+def test_add_file_to_tarball_matches_tar_add(tmp_path):
+    (tmp_path / "flow.py").write_text("print(1)\n")
+    os.chmod(tmp_path / "flow.py", 0o750)
+    os.symlink("flow.py", tmp_path / "link.py")
+    os.symlink("missing.py", tmp_path / "dangling.py")
+
+    def _members(add):
+        path = tmp_path / ("%s.tar" % add.__name__)
+        with tarfile.open(path, "w") as tar:
+            for name in ("flow.py", "link.py", "dangling.py"):
+                add(tar, str(tmp_path / name), name)
+        with tarfile.open(path) as tar:
+            return [
+                (m.name, m.type, m.mode, m.size, m.mtime, m.linkname,
+                 tar.extractfile(m).read() if m.isfile() else None)
+                for m in tar.getmembers()
+            ]
+
+    def _tar_add(tar, path, arcname):
+        tar.add(path, arcname=arcname)
+
+    assert _members(_add_file_to_tarball) == _members(_tar_add)
@@ -10,3 +10,7 @@ def test_parallel_map():
         "E",
         "F",
     ]
+
+
+def test_parallel_map_max_parallel():
+    assert parallel_map(abs, [-3, -2, -1, 0], max_parallel=2) == [3, 2, 1, 0]
@@ -0,0 +1,13 @@
+import importlib
+
+ns_mod = importlib.import_module("metaflow.namespace")
+
+
+def test_default_namespace_follows_user(monkeypatch):
+    monkeypatch.setattr(ns_mod, "_current_namespace", None)
+    monkeypatch.setattr(ns_mod, "_default_initialized", False)
+    monkeypatch.setenv("METAFLOW_USER", "alice")
+    assert ns_mod.get_namespace() == "user:alice"
+    monkeypatch.setenv("METAFLOW_USER", "bob")
+    assert ns_mod.default_namespace() == "user:bob"
+    assert ns_mod.get_namespace() == "user:bob"
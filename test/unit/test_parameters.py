@@ -0,0 +1,23 @@
+from metaflow import JSONType, Parameter
+
+
+def test_coerce_inferred_from_default():
+    assert Parameter("n", default=3)._coerce_value("7") == 7
+    assert Parameter("x", default=0.5)._coerce_value("1.5") == 1.5
+    assert Parameter("s", default="a")._coerce_value("7") == "7"
+    assert Parameter("n", default=3)._coerce_value(None) is None
+
+
+def test_coerce_bool():
+    p = Parameter("flag", type=bool)
+    assert p._coerce_value("True") is True
+    assert [p._coerce_value(v) for v in ("false", "0", "No", "")] == [False] * 4
+    assert p._coerce_value(0) is False
+
+
+def test_coerce_json_and_separator():
+    assert Parameter("j", type=JSONType)._coerce_value('{"a": 1}') == {"a": 1}
+    assert Parameter("j", type=JSONType, separator=",")._coerce_value("[1]") == [1]
+    p = Parameter("l", type=int, separator=",")
+    assert p._coerce_value("1,2") == ["1", "2"]
+    assert p._coerce_value(5) == 5
@@ -0,0 +1,407 @@
+import datetime
+import errno
+import io
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from metaflow.plugins.datatools.s3 import (
+    S3,
+    MetaflowS3NotFound,
+    S3GetObject,
+    MetaflowS3URLException,
+)
+from metaflow.plugins.datatools.s3.s3op import (
+    _dumps_metadata,
+    _loads_metadata,
+    _preallocate,
+)
+
+
+def test_run_parallel_keeps_input_order():
+    s3 = S3(s3root="s3://bucket/prefix", max_workers=4)
+    seen = set()
+
+    def _work(i):
+        seen.add(threading.get_ident())
+        time.sleep(0.01 * (8 - i))
+        return i * i
+
+    assert s3._run_parallel(_work, list(range(8))) == [i * i for i in range(8)]
+    assert len(seen) > 1
+
+
+def test_run_parallel_reraises_first_error():
+    s3 = S3(s3root="s3://bucket/prefix", max_workers=4)
+
+    def _work(i):
+        if i in (2, 5):
+            raise ValueError("item %d" % i)
+        return i
+
+    with pytest.raises(ValueError, match="item 2"):
+        s3._run_parallel(_work, list(range(8)))
+
+
+class _S3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+def _call_raising(code):
+    raise _S3Error(code)
+
+
+def test_retry_backs_off_on_transient_errors(monkeypatch):
+    import metaflow.plugins.datatools.s3.s3io as s3io
+
+    delays = []
+    monkeypatch.setattr(s3io.time, "sleep", delays.append)
+    s3 = S3(s3root="s3://bucket/prefix")
+    errors = [_S3Error("SlowDown"), _S3Error("RequestTimeout")]
+
+    def _call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert s3._retry(_call) == "ok"
+    assert len(delays) == 2
+    assert 1.0 <= delays[0] <= 1.5 and 2.0 <= delays[1] <= 3.0
+
+    delays.clear()
+    with pytest.raises(_S3Error, match="AccessDenied"):
+        s3._retry(_call_raising, "AccessDenied")
+    assert delays == []
+
+    monkeypatch.setattr(s3io, "S3_TRANSIENT_RETRY_COUNT", 2)
+    with pytest.raises(_S3Error, match="SlowDown"):
+        s3._retry(_call_raising, "SlowDown")
+    assert len(delays) == 2
+
+
+class _Body(io.BytesIO):
+    def iter_chunks(self, chunk_size=1024):
+        return iter(lambda: self.read(chunk_size), b"")
+
+
+class _RecordingClient:
+    """Minimal in-memory stand-in for a boto3 S3 client."""
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, supports_if_none_match=True):
+        self.objects = {}
+        self.calls = []
+        self.supports_if_none_match = supports_if_none_match
+
+    def head_object(self, Bucket, Key):
+        self.calls.append("head")
+        if Key not in self.objects:
+            raise _S3Error("404")
+        return {"ContentLength": len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key):
+        self.calls.append("get")
+        if Key not in self.objects:
+            raise _S3Error("NoSuchKey")
+        body = self.objects[Key]
+        return {"Body": _Body(body), "ContentLength": len(body)}
+
+    def get_paginator(self, name):
+        return self
+
+    def paginate(self, Bucket, Prefix="", **kwargs):
+        self.calls.append(("list", Prefix))
+        yield {"Contents": [{"Key": k} for k in sorted(self.objects)
+                            if k.startswith(Prefix)]}
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, **extra):
+        self.calls.append("put")
+        if IfNoneMatch is not None:
+            if not self.supports_if_none_match:
+                raise _S3Error("NotImplemented")
+            if Key in self.objects:
+                raise _S3Error("PreconditionFailed")
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.calls.append("upload")
+        self.objects[Key] = Fileobj.read()
+
+
+@pytest.mark.parametrize("conditional", [True, False])
+def test_put_without_overwrite(conditional):
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = client = _RecordingClient(supports_if_none_match=conditional)
+    assert s3.put_many([("a", b"1"), ("b", b"2")], overwrite=False) == [
+        ("a", "s3://bucket/prefix/a"),
+        ("b", "s3://bucket/prefix/b"),
+    ]
+    # Existing keys are found with one listing and never uploaded
+    assert s3.put_many([("a", b"3")], overwrite=False) == []
+    s3.put("b", b"4", overwrite=False)
+    assert client.objects == {"prefix/a": b"1", "prefix/b": b"2"}
+    calls = [call for call in client.calls if call[0] != "list"]
+    if conditional:
+        assert calls == ["put", "put", "put"]
+    else:
+        # If-None-Match is tried once, then every PUT is preceded by a HEAD
+        assert calls == ["put", "head", "put", "head", "put", "head"]
+        assert not s3._conditional_put
+
+
+def test_info_reuses_head_until_upload():
+    s3 = S3(s3root="s3://bucket/prefix", cache_info=True)
+    s3._client = client = _RecordingClient()
+    s3.put("a", b"1")
+    s3.info("a")
+    s3.info_many(["a"])
+    assert client.calls.count("head") == 1
+    s3.put("a", b"22")
+    assert s3.info("a").size == 2
+    assert client.calls.count("head") == 2
+
+
+def test_info_cache_is_opt_in_and_skips_missing():
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = client = _RecordingClient()
+    s3.put("a", b"1")
+    s3.info("a")
+    # Another writer overwrites the object
+    client.objects["prefix/a"] = b"22"
+    assert s3.info("a").size == 2
+
+    s3 = S3(s3root="s3://bucket/prefix", cache_info=True)
+    s3._client = client
+    assert not s3.info("flag", return_missing=True).exists
+    # Another writer creates the object
+    client.objects["prefix/flag"] = b"1"
+    assert s3.info("flag").exists
+
+
+def test_clients_are_shared():
+    pytest.importorskip("boto3")
+    first = S3(s3root="s3://bucket/a")._create_client()
+    assert S3(s3root="s3://bucket/b")._create_client() is first
+    assert first.meta.config.max_pool_connections >= 64
+    assert S3(s3root="s3://bucket/a", max_workers=64)._create_client() is not first
+
+
+def test_client_pool_follows_credentials(monkeypatch):
+    pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "old")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    first = S3(s3root="s3://bucket/a")._create_client()
+    assert S3(s3root="s3://bucket/a")._create_client() is first
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "rotated")
+    second = S3(s3root="s3://bucket/a")._create_client()
+    assert second is not first
+    second.client()
+    assert second._session.get_credentials().access_key == "rotated"
+
+
+def test_info_many_reports_all_missing():
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = client = _RecordingClient()
+    s3.put_many([("a", b"1"), ("c", b"333")])
+    infos = s3.info_many(["c", "b", "a"], return_missing=True)
+    assert [(i.key, i.exists, i.size) for i in infos] == [
+        ("c", True, 3), ("b", False, None), ("a", True, 1)
+    ]
+    with pytest.raises(MetaflowS3NotFound, match="prefix/b, s3://bucket/prefix/d"):
+        s3.info_many(["a", "b", "d"])
+
+
+def test_parse_url():
+    s3 = S3(s3root="s3://bucket/prefix/")
+    assert s3._parse_url("s3://other/a/b?c") == ("other", "a/b?c", "s3://other/a/b?c")
+    assert s3._parse_url("/x/y") == ("bucket", "prefix/x/y", "s3://bucket/prefix/x/y")
+    assert S3(s3root="s3://bucket")._parse_url("k")[1] == "k"
+    for url in ("s3://bucket", "s3://bucket/"):
+        with pytest.raises(MetaflowS3URLException):
+            s3._parse_url(url)
+
+
+def test_get_in_memory():
+    with S3(s3root="s3://bucket/prefix") as s3:
+        s3._client = _RecordingClient()
+        s3.put("a", b"abc")
+        on_disk = s3.get("a")
+        in_memory = s3.get("a", in_memory=True)
+        assert on_disk.path is not None and in_memory.path is None
+        assert on_disk.blob == in_memory.blob == b"abc"
+        assert in_memory.size == 3 and in_memory.range_info == (3, 0, 3)
+        missing = s3.get_many(["b"], return_missing=True, in_memory=True)[0]
+        assert not missing.exists and missing.blob is None
+
+
+def test_list_recursive_sharded():
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = client = _RecordingClient()
+    s3.put_many([("d/%s" % name, b"") for name in ("0a", "1b", "1c", "f0")])
+    keys = [obj.key for obj in s3.list_recursive(["d"], shard_prefixes="01f1")]
+    assert keys == ["d/0a", "d/1b", "d/1c", "d/f0"]
+    assert sorted(c for c in client.calls if c[0] == "list") == [
+        ("list", "prefix/d/0"), ("list", "prefix/d/1"), ("list", "prefix/d/f")
+    ]
+
+
+def test_existing_keys_gives_up_on_large_ranges():
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = _RecordingClient()
+    s3.put_many([("k%05d" % i, b"") for i in range(1100)])
+    assert s3._existing_keys([("k00001", b""), ("k00003", b"")]) == {
+        "prefix/k00001", "prefix/k00003"
+    }
+    assert s3._existing_keys([("k00001", b""), ("k01099", b"")]) == set()
+
+
+def test_metadata_round_trips():
+    for meta in ({"a": 1, "b": [1, 2]}, {"name": "café"}, {1: "x"}):
+        raw = _dumps_metadata(meta)
+        assert raw.isascii()
+        assert _loads_metadata(raw) == json.loads(json.dumps(meta))
+    assert math.isnan(_loads_metadata('{"x": NaN}')["x"])
+    for value in (float("nan"), float("inf"), -float("inf")):
+        raw = _dumps_metadata({"x": value})
+        assert raw == json.dumps({"x": value})
+        assert repr(_loads_metadata(raw)["x"]) == repr(value)
+    for bad in (datetime.date(2024, 1, 2), uuid.UUID(int=1)):
+        with pytest.raises(TypeError):
+            _dumps_metadata({"x": bad})
+
+
+def test_clients_are_per_thread_and_reused():
+    pytest.importorskip("boto3")
+    pool = S3(s3root="s3://bucket/a", max_workers=3)._create_client()
+    mine = pool.client()
+    assert pool.client() is mine
+
+    def _other():
+        return pool.client()
+
+    first = S3(s3root="s3://bucket/a", max_workers=3)._run_parallel(
+        lambda _: _other(), [0, 1]
+    )
+    assert mine not in first
+    # Clients of exited worker threads are handed to the next ones
+    second = threading.Thread(target=lambda: first.append(_other()))
+    second.start()
+    second.join()
+    assert first[-1] in first[:-1]
+
+
+class _SlowListingClient(_RecordingClient):
+    """Lists one key per page; a page is only served once the previous
+    key's download has started."""
+
+    def __init__(self):
+        super().__init__()
+        self.fetched = threading.Semaphore(0)
+
+    def get_object(self, Bucket, Key):
+        self.fetched.release()
+        return super().get_object(Bucket, Key)
+
+    def paginate(self, Bucket, Prefix="", **kwargs):
+        for i, key in enumerate(k for k in sorted(self.objects) if k.startswith(Prefix)):
+            if i:
+                assert self.fetched.acquire(timeout=5), "listing was not pipelined"
+            yield {"Contents": [{"Key": key}]}
+
+
+def test_get_recursive_downloads_while_listing():
+    with S3(s3root="s3://bucket/prefix", max_workers=4) as s3:
+        s3._client = _SlowListingClient()
+        s3.put_many([("d/%d" % i, b"%d" % i) for i in range(5)])
+        objs = s3.get_recursive(["d"])
+        assert [(o.key, o.blob) for o in objs] == [
+            ("d/%d" % i, b"%d" % i) for i in range(5)
+        ]
+
+
+def test_large_bodies_are_uploaded_in_parts(monkeypatch):
+    pytest.importorskip("boto3")
+    import metaflow.plugins.datatools.s3.s3io as s3io
+
+    monkeypatch.setattr(s3io, "S3_MULTIPART_THRESHOLD", 4)
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = client = _RecordingClient()
+    s3.put("small", b"1234")
+    s3.put_many([("large", b"12345")])
+    # Conditional PUTs can't go through upload_fileobj
+    s3.put("new", b"12345", overwrite=False)
+    assert client.calls == ["put", "upload", "put"]
+    assert client.objects["prefix/large"] == b"12345"
+
+
+def test_preallocate_falls_back_to_sparse_file(monkeypatch, tmp_path):
+    with open(tmp_path / "a", "wb") as f:
+        _preallocate(f.fileno(), 1000)
+    assert os.path.getsize(tmp_path / "a") == 1000
+
+    def _unsupported(fd, offset, length):
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    monkeypatch.setattr(os, "posix_fallocate", _unsupported, raising=False)
+    with open(tmp_path / "b", "wb") as f:
+        _preallocate(f.fileno(), 1000)
+    assert os.path.getsize(tmp_path / "b") == 1000
+
+
+def test_relative_keys():
+    s3 = S3(s3root="s3://bucket/prefix/")
+    assert s3._relative_key("s3://bucket/prefix/a/b") == "a/b"
+    assert s3._relative_key("s3://other/a") == "s3://other/a"
+    assert s3._key_in_root("prefix/a/b") == "a/b"
+    assert S3(s3root="s3://bucket")._key_in_root("a/b") == "a/b"
+    assert S3()._relative_key("s3://bucket/a") == "s3://bucket/a"
+
+
+class _ConcurrentListingClient(_RecordingClient):
+    """Only serves a listing once two of them are in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def paginate(self, Bucket, Prefix="", **kwargs):
+        self.barrier.wait()
+        return super().paginate(Bucket, Prefix=Prefix, **kwargs)
+
+
+def test_list_recursive_lists_prefixes_concurrently():
+    s3 = S3(s3root="s3://bucket/prefix")
+    s3._client = _ConcurrentListingClient()
+    s3.put_many([("b/1", b""), ("a/2", b""), ("a/1", b"")])
+    objs = s3.list_recursive(iter(["b", "a"]))
+    assert [(o.key, o.prefix) for o in objs] == [
+        ("b/1", "s3://bucket/prefix/b"),
+        ("a/1", "s3://bucket/prefix/a"),
+        ("a/2", "s3://bucket/prefix/a"),
+    ]
+
+
+def test_listed_objects_match_constructed_ones():
+    listed = S3GetObject._listed("s3://b/p/k", "k", "s3://b/p", True, 3)
+    built = S3GetObject("s3://b/p/k")
+    built.key, built.prefix, built.exists, built.size = "k", "s3://b/p", True, 3
+    assert [getattr(listed, a) for a in S3GetObject.__slots__] == [
+        getattr(built, a) for a in S3GetObject.__slots__
+    ]
+
+
+def test_paginators_are_reused():
+    pytest.importorskip("boto3")
+    pool = S3(s3root="s3://bucket/a")._create_client()
+    paginator = pool.get_paginator("list_objects_v2")
+    assert pool.get_paginator("list_objects_v2") is paginator